@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 from .joyo import extract_joyo_kanji
-from .kyoiku import fetch_kyoiku_kanji_by_grade
+from .kyoiku import KyoikuKanji, fetch_kyoiku_kanji, fetch_kyoiku_kanji_by_grade
 
 __all__ = [
+    "KyoikuKanji",
     "extract_joyo_kanji",
+    "fetch_kyoiku_kanji",
     "fetch_kyoiku_kanji_by_grade",
 ]
 
@@ -0,0 +1,29 @@
+"""Kanji character-class regexes shared by the crawler modules."""
+
+from __future__ import annotations
+
+import re
+
+
+# CJK Unified Ideographs + extensions + compatibility ideographs.
+KANJI_CODEPOINT_RANGES = (
+    (0x3400, 0x4DBF),  # Ext A
+    (0x4E00, 0x9FFF),  # Unified
+    (0xF900, 0xFAFF),  # Compatibility
+    (0x20000, 0x2EBEF),  # Ext B..F (covers beyond; fine for matching)
+)
+# The regex character class is derived from the codepoints so the two cannot drift apart.
+KANJI_RANGES = "".join(rf"\U{lo:08X}-\U{hi:08X}" for lo, hi in KANJI_CODEPOINT_RANGES)
+KANJI_CHAR_RE = re.compile(rf"^[{KANJI_RANGES}]$")
+KANJI_START_RE = re.compile(rf"^[{KANJI_RANGES}]")
+
+
+def is_kanji_char(s: str) -> bool:
+    """True if `s` is exactly one kanji character."""
+    if len(s) != 1:
+        return False
+    cp = ord(s)
+    for lo, hi in KANJI_CODEPOINT_RANGES:
+        if lo <= cp <= hi:
+            return True
+    return False
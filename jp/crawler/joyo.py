@@ -2,14 +2,19 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
+import io
 import json
 import re
 import subprocess
 import sys
 import tempfile
 import urllib.request
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 
+from ._kanji_re import KANJI_START_RE
+
 
 DEFAULT_PDF_URL = (
     "https://www.bunka.go.jp/kokugo_nihongo/sisaku/joho/joho/kijun/naikaku/"
@@ -17,15 +22,8 @@ DEFAULT_PDF_URL = (
 )
 EXPECTED_KANJI_COUNT = 2136
 
-# CJK Unified Ideographs + extensions + compatibility ideographs.
-KANJI_RANGES = (
-    r"\u3400-\u4DBF"  # Ext A
-    r"\u4E00-\u9FFF"  # Unified
-    r"\uF900-\uFAFF"  # Compatibility
-    r"\U00020000-\U0002EBEF"  # Ext B..F (covers beyond; fine for matching)
-)
-KANJI_CHAR_RE = re.compile(rf"^[{KANJI_RANGES}]$")
-KANJI_START_RE = re.compile(rf"^[{KANJI_RANGES}]")
+# Punctuation that only appears in example/usage lines, never in a header line.
+NON_HEADER_PUNCT_RE = re.compile("[，、。・:：]")
 
 
 def download_pdf(url: str, dest: Path) -> None:
@@ -40,27 +38,40 @@ def download_pdf(url: str, dest: Path) -> None:
         f.write(resp.read())
 
 
-def run_pdftotext(pdf_path: Path, txt_path: Path) -> None:
-    try:
-        subprocess.run(
-            ["pdftotext", "-enc", "UTF-8", "-nopgbrk", str(pdf_path), str(txt_path)],
-            check=True,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.PIPE,
-            text=True,
-        )
-    except FileNotFoundError as e:
-        raise RuntimeError("Missing 'pdftotext' (Poppler). Install it first.") from e
-    except subprocess.CalledProcessError as e:
-        raise RuntimeError(f"pdftotext failed: {e.stderr.strip()}") from e
-
-
-def extract_joyo_kanji(pdftotext_output: str) -> list[str]:
+def iter_pdftotext_lines(pdf_path: Path) -> Iterator[str]:
+    """Yield pdftotext output line by line from its stdout, without a temp text file."""
+    # stderr goes to a temp file so a chatty pdftotext can never block on a full pipe.
+    with tempfile.TemporaryFile() as err:
+        try:
+            proc = subprocess.Popen(
+                ["pdftotext", "-enc", "UTF-8", "-nopgbrk", str(pdf_path), "-"],
+                stdout=subprocess.PIPE,
+                stderr=err,
+            )
+        except FileNotFoundError as e:
+            raise RuntimeError("Missing 'pdftotext' (Poppler). Install it first.") from e
+        with proc:
+            yield from io.TextIOWrapper(proc.stdout, encoding="utf-8", errors="replace")
+        if proc.returncode != 0:
+            err.seek(0)
+            stderr = err.read().decode("utf-8", errors="replace")
+            raise RuntimeError(f"pdftotext failed: {stderr.strip()}")
+
+
+def extract_joyo_kanji(pdftotext_output: str | Iterable[str]) -> list[str]:
     ordered: list[str] = []
     seen: set[str] = set()
 
+    lines = (
+        pdftotext_output.splitlines() if isinstance(pdftotext_output, str) else pdftotext_output
+    )
+    # Bound once; the loop below runs over every line of the PDF text.
+    seen_add = seen.add
+    ordered_append = ordered.append
+    punct_search = NON_HEADER_PUNCT_RE.search
+    kanji_start_match = KANJI_START_RE.match
     started = False
-    for raw in pdftotext_output.splitlines():
+    for raw in lines:
         # Keep leading whitespace: in this PDF, some variant-form lines are indented.
         raw = raw.replace("\x0c", "")
 
@@ -80,28 +91,24 @@ def extract_joyo_kanji(pdftotext_output: str) -> list[str]:
             continue
 
         # Skip example lines and other non-header lines that often contain punctuation.
-        if any(ch in line for ch in ("，", "、", "。", "・", ":", "：")):
+        if punct_search(line):
             continue
 
-        if not KANJI_START_RE.match(line):
+        if not kanji_start_match(line):
             continue
 
         first = line[0]
 
-        is_header = False
-        if KANJI_CHAR_RE.match(line):
-            is_header = True
-        elif "（" in line or "）" in line or " " in line or "\t" in line:
-            is_header = True
-
+        # KANJI_START_RE already matched, so a 1-char line is a bare kanji header.
+        is_header = len(line) == 1 or "（" in line or "）" in line or " " in line or "\t" in line
         if not is_header:
             continue
 
         if first in seen:
             continue
 
-        seen.add(first)
-        ordered.append(first)
+        seen_add(first)
+        ordered_append(first)
 
         # End of 常用漢字表 in gojūon order.
         if first == "腕":
@@ -111,11 +118,9 @@ def extract_joyo_kanji(pdftotext_output: str) -> list[str]:
 
 
 def extract_joyo_kanji_from_pdf(pdf_path: Path) -> list[str]:
-    with tempfile.TemporaryDirectory(prefix="joyo-kanji-") as tmpdir:
-        txt_path = Path(tmpdir) / "joyo.txt"
-        run_pdftotext(pdf_path, txt_path)
-        pdf_text = txt_path.read_text(encoding="utf-8", errors="replace")
-    return extract_joyo_kanji(pdf_text)
+    # extract_joyo_kanji stops at 腕, so close the stream instead of reading the appendix.
+    with contextlib.closing(iter_pdftotext_lines(pdf_path)) as lines:
+        return extract_joyo_kanji(lines)
 
 
 def write_joyo_output(kanji: list[str], out_path: Path, fmt: str) -> None:
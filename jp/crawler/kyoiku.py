@@ -2,41 +2,72 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
+import os
 import re
 import sys
+import time
 import urllib.parse
 import urllib.request
-from dataclasses import dataclass
-from html.parser import HTMLParser
+from dataclasses import dataclass, field
+from html import escape, unescape
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+from ._kanji_re import is_kanji_char
+
 
 WIKI_API = "https://ja.wikipedia.org/w/api.php"
 WIKI_PAGE = "学年別漢字配当表"
 USER_AGENT = "Mozilla/5.0 (jp.crawler.kyoiku)"
+DEFAULT_CACHE_TTL_S = 24 * 60 * 60
 
 EXPECTED_TOTAL = 1026
 EXPECTED_PER_GRADE = {1: 80, 2: 160, 3: 200, 4: 202, 5: 193, 6: 191}
 
-# CJK Unified Ideographs + extensions + compatibility ideographs.
-KANJI_RANGES = (
-    r"\u3400-\u4DBF"  # Ext A
-    r"\u4E00-\u9FFF"  # Unified
-    r"\uF900-\uFAFF"  # Compatibility
-    r"\U00020000-\U0002EBEF"  # Ext B..F (covers beyond; fine for matching)
-)
-KANJI_CHAR_RE = re.compile(rf"^[{KANJI_RANGES}]$")
+GRADE_TITLE_RE = re.compile(r"^第([1-6])学年（(\d+)字）$")
+# MediaWiki renders each table cell as a plain `<a ... class="extiw" title="wikt:字">字</a>`.
+LINK_RE = re.compile(r"<a\s([^>]*)>([^<]*)</a>")
+ATTR_RE = re.compile(r'([\w-]+)="([^"]*)"')
 
 
-def wiki_get(params: dict[str, str | int]) -> dict:
+def wiki_get(
+    params: dict[str, str | int],
+    *,
+    cache_dir: Path | None = None,
+    cache_ttl_s: int = DEFAULT_CACHE_TTL_S,
+) -> dict:
     query = urllib.parse.urlencode({k: str(v) for k, v in params.items()})
-    req = urllib.request.Request(
-        f"{WIKI_API}?{query}",
-        headers={"User-Agent": USER_AGENT},
-    )
+    url = f"{WIKI_API}?{query}"
+
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = cache_dir / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+        # Any unreadable cache entry (missing, truncated, not UTF-8, bad JSON) is just a miss.
+        try:
+            if time.time() - cache_path.stat().st_mtime < cache_ttl_s:
+                return json.loads(cache_path.read_bytes())
+        except (OSError, ValueError):
+            pass
+
+    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
     with urllib.request.urlopen(req, timeout=30) as resp:
-        return json.load(resp)
+        body = resp.read()
+        no_store = "no-store" in (resp.headers.get("Cache-Control") or "")
+    obj = json.loads(body)
+
+    # MediaWiki reports API errors with HTTP 200 and an "error" key; never cache those.
+    if cache_path is not None and not no_store and "error" not in obj:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(".tmp")
+        tmp_path.write_bytes(body)
+        os.replace(tmp_path, cache_path)
+    return obj
 
 
 @dataclass(frozen=True)
@@ -44,26 +75,50 @@ class GradeSection:
     grade: int
     index: str
     title: str
+    html: str = field(repr=False)
 
 
-def fetch_grade_sections() -> list[GradeSection]:
+def fetch_page(cache_dir: Path | None = None) -> dict:
+    """Fetch the section list and the full page HTML in a single API call."""
     obj = wiki_get(
         {
             "action": "parse",
             "page": WIKI_PAGE,
-            "prop": "sections",
+            "prop": "sections|text",
             "format": "json",
             "formatversion": 2,
-        }
+        },
+        cache_dir=cache_dir,
     )
-    sections = obj["parse"]["sections"]
+    return obj["parse"]
 
-    grade_sections: list[GradeSection] = []
-    grade_title_re = re.compile(r"^第([1-6])学年（(\d+)字）$")
 
-    for section in sections:
+def _heading_offset(html: str, anchor: str) -> int:
+    pos = html.find(f'id="{escape(anchor)}"')
+    if pos == -1:
+        raise RuntimeError(f"Section anchor not found in page HTML: {anchor}")
+    return html.rfind("<h", 0, pos)
+
+
+def _section_html(html: str, sections: list[dict], pos: int) -> str:
+    # Like `action=parse&section=N`: run until the next heading of the same or higher level.
+    section = sections[pos]
+    level = int(section["level"])
+    start = _heading_offset(html, section["anchor"])
+    for following in sections[pos + 1 :]:
+        if int(following["level"]) <= level:
+            return html[start : _heading_offset(html, following["anchor"])]
+    return html[start:]
+
+
+def grade_sections_from_page(page: dict) -> list[GradeSection]:
+    sections = page["sections"]
+    html = page["text"]
+
+    grade_sections: list[GradeSection] = []
+    for pos, section in enumerate(sections):
         title = section.get("line", "")
-        m = grade_title_re.match(title)
+        m = GRADE_TITLE_RE.match(title)
         if not m:
             continue
         grade = int(m.group(1))
@@ -71,7 +126,12 @@ def fetch_grade_sections() -> list[GradeSection]:
         if EXPECTED_PER_GRADE.get(grade) != expected:
             raise RuntimeError(f"Unexpected count in title: {title}")
         grade_sections.append(
-            GradeSection(grade=grade, index=str(section["index"]), title=title)
+            GradeSection(
+                grade=grade,
+                index=str(section["index"]),
+                title=title,
+                html=_section_html(html, sections, pos),
+            )
         )
 
     grade_sections.sort(key=lambda s: s.grade)
@@ -80,58 +140,41 @@ def fetch_grade_sections() -> list[GradeSection]:
     return grade_sections
 
 
-class ExtiwKanjiParser(HTMLParser):
-    def __init__(self) -> None:
-        super().__init__()
-        self._in_target_link = False
-        self.kanji: list[str] = []
-
-    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
-        if tag != "a":
-            return
-        attr = {k: (v or "") for k, v in attrs}
+def extract_grade_kanji(section_html: str) -> list[str]:
+    kanji: list[str] = []
+    for attrs, text in LINK_RE.findall(section_html):
+        if "extiw" not in attrs:
+            continue
+        attr = dict(ATTR_RE.findall(attrs))
         if attr.get("class") != "extiw":
-            return
-        if not attr.get("title", "").startswith("wikt:"):
-            return
-        self._in_target_link = True
+            continue
+        if not unescape(attr.get("title", "")).startswith("wikt:"):
+            continue
+        s = unescape(text).strip()
+        if is_kanji_char(s):
+            kanji.append(s)
+    return kanji
 
-    def handle_endtag(self, tag: str) -> None:
-        if tag == "a":
-            self._in_target_link = False
 
-    def handle_data(self, data: str) -> None:
-        if not self._in_target_link:
-            return
-        s = data.strip()
-        if KANJI_CHAR_RE.match(s):
-            self.kanji.append(s)
+@dataclass(frozen=True)
+class KyoikuKanji:
+    """All kanji in grade order, plus each grade's `[start, end)` slice of `ordered`."""
 
+    ordered: list[str]
+    spans: dict[int, tuple[int, int]]
 
-def fetch_grade_kanji(section_index: str) -> list[str]:
-    obj = wiki_get(
-        {
-            "action": "parse",
-            "page": WIKI_PAGE,
-            "prop": "text",
-            "section": section_index,
-            "format": "json",
-            "formatversion": 2,
-        }
-    )
-    html = obj["parse"]["text"]
-    parser = ExtiwKanjiParser()
-    parser.feed(html)
-    return parser.kanji
+    def by_grade(self) -> dict[int, list[str]]:
+        return {grade: self.ordered[start:end] for grade, (start, end) in self.spans.items()}
 
 
-def fetch_kyoiku_kanji_by_grade() -> dict[int, list[str]]:
-    grade_sections = fetch_grade_sections()
-    by_grade: dict[int, list[str]] = {}
+def fetch_kyoiku_kanji(cache_dir: Path | None = None) -> KyoikuKanji:
+    grade_sections = grade_sections_from_page(fetch_page(cache_dir=cache_dir))
+    ordered: list[str] = []
+    spans: dict[int, tuple[int, int]] = {}
     seen: set[str] = set()
 
     for sec in grade_sections:
-        items = fetch_grade_kanji(sec.index)
+        items = extract_grade_kanji(sec.html)
         expected = EXPECTED_PER_GRADE[sec.grade]
         if len(items) != expected:
             raise RuntimeError(
@@ -141,20 +184,17 @@ def fetch_kyoiku_kanji_by_grade() -> dict[int, list[str]]:
         if dup:
             raise RuntimeError(f"{sec.title}: duplicate kanji across grades: {dup[:10]}")
         seen.update(items)
-        by_grade[sec.grade] = items
+        start = len(ordered)
+        ordered.extend(items)
+        spans[sec.grade] = (start, len(ordered))
 
-    if sum(len(v) for v in by_grade.values()) != EXPECTED_TOTAL:
-        raise RuntimeError(
-            f"Extracted {sum(len(v) for v in by_grade.values())} kanji, expected {EXPECTED_TOTAL}."
-        )
-    return by_grade
+    if len(ordered) != EXPECTED_TOTAL:
+        raise RuntimeError(f"Extracted {len(ordered)} kanji, expected {EXPECTED_TOTAL}.")
+    return KyoikuKanji(ordered=ordered, spans=spans)
 
 
-def flatten_by_grade(by_grade: dict[int, list[str]]) -> list[str]:
-    all_kanji: list[str] = []
-    for grade in range(1, 7):
-        all_kanji.extend(by_grade.get(grade, []))
-    return all_kanji
+def fetch_kyoiku_kanji_by_grade(cache_dir: Path | None = None) -> dict[int, list[str]]:
+    return fetch_kyoiku_kanji(cache_dir=cache_dir).by_grade()
 
 
 def write_kyoiku_output(kanji: list[str], out_path: Path, fmt: str) -> None:
@@ -188,10 +228,21 @@ def main(argv: list[str] | None = None) -> int:
         default="data/kyoiku_kanji_2020_by_grade.json",
         help="Write per-grade JSON (default: %(default)s).",
     )
+    parser.add_argument(
+        "--cache-dir",
+        default="data/wiki_cache",
+        help="Reuse Wikipedia API responses younger than 24h from here (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always hit the Wikipedia API and do not write the response cache.",
+    )
     args = parser.parse_args(argv)
 
-    by_grade = fetch_kyoiku_kanji_by_grade()
-    all_kanji = flatten_by_grade(by_grade)
+    cache_dir = None if args.no_cache else Path(args.cache_dir)
+    kyoiku = fetch_kyoiku_kanji(cache_dir=cache_dir)
+    all_kanji = kyoiku.ordered
 
     out_path = Path(args.out)
     write_kyoiku_output(all_kanji, out_path, args.format)
@@ -201,12 +252,15 @@ def main(argv: list[str] | None = None) -> int:
     payload = {
         "source": {"wiki_api": WIKI_API, "page": WIKI_PAGE},
         "total": len(all_kanji),
-        "per_grade": {str(g): len(v) for g, v in by_grade.items()},
-        "by_grade": {str(g): v for g, v in by_grade.items()},
+        "per_grade": {str(g): end - start for g, (start, end) in kyoiku.spans.items()},
+        "by_grade": {str(g): v for g, v in kyoiku.by_grade().items()},
     }
-    out_json_path.write_text(
-        json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
-    )
+    if orjson is not None:
+        out_json_path.write_bytes(orjson.dumps(payload, option=orjson.OPT_INDENT_2) + b"\n")
+    else:
+        out_json_path.write_text(
+            json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8"
+        )
 
     print(f"Extracted {len(all_kanji)} kanji -> {out_path}", file=sys.stderr)
     return 0
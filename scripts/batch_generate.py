@@ -1,17 +1,18 @@
 #!/usr/bin/env python3
 """批量生成日语词汇详解 - 支持并发"""
 import asyncio
+import os
 import subprocess
 import sys
 from pathlib import Path
 
 SCRIPT_DIR = Path(__file__).parent
 PROMPT_TEMPLATE = SCRIPT_DIR / "prompts" / "kanji_explain.md"
+_PROMPT_TEXT = PROMPT_TEMPLATE.read_text(encoding="utf-8")
 OUT_DIR = SCRIPT_DIR.parent / "data" / "kanji_explanations"
 
 def load_prompt(word: str) -> str:
-    template = PROMPT_TEMPLATE.read_text(encoding="utf-8")
-    return template.replace("{kanji}", word)
+    return _PROMPT_TEXT.replace("{kanji}", word)
 
 async def run_claude(word: str) -> tuple[str, str]:
     """异步调用 claude CLI"""
@@ -31,17 +32,20 @@ async def run_claude(word: str) -> tuple[str, str]:
 
 def clean_markdown(text: str) -> str:
     text = text.strip()
+    # 只切首尾围栏行，不把整段输出 split 成行列表
     if text.startswith("```"):
-        lines = text.split("\n")
-        if lines[-1].strip() == "```":
-            lines = lines[1:-1]
-            if lines and lines[0].strip().lower() in ("markdown", "md", ""):
-                lines = lines[1:]
-            text = "\n".join(lines)
+        last_nl = text.rfind("\n")
+        if text[last_nl + 1 :].strip() == "```":
+            first_nl = text.find("\n")
+            text = text[first_nl + 1 : last_nl] if first_nl < last_nl else ""
+            nl = text.find("\n")
+            first_line = text if nl == -1 else text[:nl]
+            if text and first_line.strip().lower() in ("markdown", "md", ""):
+                text = "" if nl == -1 else text[nl + 1 :]
     return text.strip()
 
-async def batch_generate(words: list[str], concurrency: int = 5):
-    """并发生成多个词汇的解释"""
+async def batch_generate(words: list[str], concurrency: int = 5) -> list[Path]:
+    """并发生成多个词汇的解释，返回写出的 md 文件"""
     OUT_DIR.mkdir(parents=True, exist_ok=True)
 
     sem = asyncio.Semaphore(concurrency)
@@ -58,15 +62,27 @@ async def batch_generate(words: list[str], concurrency: int = 5):
             return word, bool(content)
 
     tasks = [limited_run(w) for w in words]
-    results = await asyncio.gather(*tasks)
-
-    success = sum(1 for _, ok in results if ok)
-    print(f"\n完成: {success}/{len(words)} 个词汇", file=sys.stderr)
-
-def make_epub():
+    done: set[str] = set()
+    for fut in asyncio.as_completed(tasks):
+        word, ok = await fut
+        if ok:
+            done.add(word)
+    md_files = [OUT_DIR / f"{w}.md" for w in words if w in done]
+    print(f"\n完成: {len(md_files)}/{len(words)} 个词汇", file=sys.stderr)
+    return md_files
+
+def clean_out_dir():
+    """删除旧的 md 文件（只扫描一次目录）"""
+    if not OUT_DIR.exists():
+        return
+    with os.scandir(OUT_DIR) as it:
+        for entry in it:
+            if entry.name.endswith(".md") and entry.is_file():
+                os.unlink(entry.path)
+
+def make_epub(md_files: list[Path]):
     """生成 epub"""
     from make_epub import create_epub
-    md_files = list(OUT_DIR.glob("*.md"))
     if md_files:
         output = OUT_DIR / "日语词汇详解.epub"
         create_epub(md_files, output, "日语词汇详解")
@@ -76,11 +92,10 @@ if __name__ == "__main__":
     GRADE1_FIRST5 = ["一", "二", "三", "四", "五"]
 
     # 清理旧文件
-    for f in OUT_DIR.glob("*.md"):
-        f.unlink()
+    clean_out_dir()
 
     # 并发生成
-    asyncio.run(batch_generate(GRADE1_FIRST5, concurrency=5))
+    md_files = asyncio.run(batch_generate(GRADE1_FIRST5, concurrency=5))
 
-    # 生成 epub
-    make_epub()
+    # 生成 epub：直接用刚写出的文件，不再重新 glob
+    make_epub(md_files)
@@ -3,50 +3,107 @@
 import asyncio
 import json
 import os
+import re
 import sys
 from datetime import datetime
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 SCRIPT_DIR = Path(__file__).parent
 DATA_DIR = SCRIPT_DIR.parent / "data"
 DB_FILE = DATA_DIR / "kanji_db.json"
 PROMPT_TEMPLATE = SCRIPT_DIR / "prompts" / "kanji_explain.md"
+_PROMPT_TEXT = PROMPT_TEMPLATE.read_text(encoding="utf-8")
+SAVE_EVERY = 25  # 每处理这么多个汉字才整体回写一次数据库
+DEFAULT_BATCH_SIZE = 5  # 每次 claude 调用解释的汉字数，1 表示不合批
+KANJI_SEPARATOR_RE = re.compile(r"^---KANJI:(.+?)---[ \t]*$", re.MULTILINE)
 
 def load_db() -> dict:
     return json.loads(DB_FILE.read_text(encoding="utf-8"))
 
 def save_db(db: dict):
     db["meta"]["last_updated"] = datetime.now().isoformat()
-    DB_FILE.write_text(json.dumps(db, ensure_ascii=False, indent=2), encoding="utf-8")
+    # 先写临时文件再 os.replace，中途崩溃也不会留下半截数据库
+    tmp_path = DB_FILE.with_suffix(".json.tmp")
+    if orjson is not None:
+        tmp_path.write_bytes(orjson.dumps(db, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        tmp_path.write_text(json.dumps(db, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp_path, DB_FILE)
+
+def snapshot_db(db: dict) -> dict:
+    """复制出可在后台线程序列化的快照（只复制到条目层，content 字符串共享）"""
+    return {**db, "meta": dict(db["meta"]), "kanji": {k: dict(v) for k, v in db["kanji"].items()}}
 
 def load_prompt(word: str) -> str:
-    template = PROMPT_TEMPLATE.read_text(encoding="utf-8")
-    return template.replace("{kanji}", word)
+    return _PROMPT_TEXT.replace("{kanji}", word)
+
+def load_batch_prompt(words: list[str]) -> str:
+    """一次 claude 调用解释多个汉字，每份输出以 ---KANJI:字--- 分隔"""
+    header = (
+        f"下面一次要解释 {len(words)} 个汉字：{'、'.join(words)}。\n"
+        "请按顺序为每个汉字各输出一份完整解释，格式遵守下方模板，模板中的 [当前汉字] 换成正在解释的字。\n"
+        f"每份解释之前单独一行写分隔符 `---KANJI:<汉字>---`（例如 `---KANJI:{words[0]}---`），"
+        "分隔符之外不要输出任何多余内容。\n\n"
+    )
+    return header + _PROMPT_TEXT.replace("{kanji}", "[当前汉字]")
+
+def split_batch_output(text: str, words: list[str]) -> dict[str, str]:
+    """按分隔符拆出每个汉字的 Markdown；缺失或多余的汉字直接忽略"""
+    parts = KANJI_SEPARATOR_RE.split(text)
+    wanted = set(words)
+    result: dict[str, str] = {}
+    for kanji, body in zip(parts[1::2], parts[2::2]):
+        kanji = kanji.strip()
+        if kanji in wanted and kanji not in result:
+            body = clean_markdown(body)
+            if body:
+                result[kanji] = body
+    return result
 
 def clean_markdown(text: str) -> str:
     text = text.strip()
+    # 只切首尾围栏行，不把整段输出 split 成行列表
     if text.startswith("```"):
-        lines = text.split("\n")
-        if lines[-1].strip() == "```":
-            lines = lines[1:-1]
-            if lines and lines[0].strip().lower() in ("markdown", "md", ""):
-                lines = lines[1:]
-            text = "\n".join(lines)
+        last_nl = text.rfind("\n")
+        if text[last_nl + 1 :].strip() == "```":
+            first_nl = text.find("\n")
+            text = text[first_nl + 1 : last_nl] if first_nl < last_nl else ""
+            nl = text.find("\n")
+            first_line = text if nl == -1 else text[:nl]
+            if text and first_line.strip().lower() in ("markdown", "md", ""):
+                text = "" if nl == -1 else text[nl + 1 :]
     return text.strip()
 
-async def run_claude(word: str) -> tuple[str, str]:
-    """异步调用 claude CLI"""
-    prompt = load_prompt(word)
+async def _call_claude(prompt: str) -> str:
     cmd = ["claude", "-p", "--output-format", "text", "--max-turns", "3", prompt]
+    # 失败时只看返回码，stderr 从不读取，直接丢给 DEVNULL 免得白白缓冲
     proc = await asyncio.create_subprocess_exec(
-        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
     )
-    stdout, stderr = await proc.communicate()
+    stdout, _ = await proc.communicate()
     if proc.returncode != 0:
-        return word, ""
-    return word, stdout.decode().strip()
+        return ""
+    return stdout.decode().strip()
+
+async def run_claude(word: str) -> tuple[str, str]:
+    """异步调用 claude CLI"""
+    return word, await _call_claude(load_prompt(word))
 
-async def batch_generate(concurrency: int = 3):
+async def run_claude_batch(words: list[str]) -> list[tuple[str, str]]:
+    """一次 claude 调用生成多个汉字，摊薄 CLI 启动开销；返回已清理的 Markdown"""
+    if len(words) == 1:
+        word, content = await run_claude(words[0])
+        return [(word, clean_markdown(content) if content else "")]
+    output = await _call_claude(load_batch_prompt(words))
+    parsed = split_batch_output(output, words)
+    return [(word, parsed.get(word, "")) for word in words]
+
+async def batch_generate(concurrency: int = 3, batch_size: int = DEFAULT_BATCH_SIZE):
     """并发生成，写入JSON数据库"""
     db = load_db()
     pending = [k for k, v in db["kanji"].items() if v["status"] == "pending"]
@@ -56,38 +113,60 @@ async def batch_generate(concurrency: int = 3):
         return
 
     total_pending = len(pending)
-    print(f"待生成: {total_pending} 个汉字，并发: {concurrency}", file=sys.stderr)
+    batch_size = max(1, batch_size)
+    print(f"待生成: {total_pending} 个汉字，并发: {concurrency}，批大小: {batch_size}", file=sys.stderr)
     sem = asyncio.Semaphore(concurrency)
-    lock = asyncio.Lock()
-    completed = [0]  # 用列表以便在闭包中修改
+    completed = 0
+    unsaved = 0  # 上次写盘（或排队写盘）之后又改动过的条目数
+    save_queue: asyncio.Queue[dict | None] = asyncio.Queue()
+
+    async def db_writer():
+        # 序列化+写盘放到线程里做，不占用事件循环
+        while (snapshot := await save_queue.get()) is not None:
+            await asyncio.to_thread(save_db, snapshot)
 
-    async def process_one(kanji: str, idx: int):
+    async def process_batch(words: list[str], idx: int) -> list[tuple[str, str]]:
         async with sem:
-            print(f"[{idx}/{total_pending}] 生成中: {kanji}", file=sys.stderr)
-            _, content = await run_claude(kanji)
-            async with lock:
+            print(f"[批 {idx}/{len(batches)}] 生成中: {''.join(words)}", file=sys.stderr)
+            return await run_claude_batch(words)
+
+    # 按年级顺序处理：先一次性装饰成 (grade, kanji) 元组再排序，比较时不再查字典
+    decorated = [(db["kanji"][k]["grade"], k) for k in pending]
+    decorated.sort()
+    pending_sorted = [k for _, k in decorated]
+    batches = [pending_sorted[i : i + batch_size] for i in range(0, total_pending, batch_size)]
+
+    # 真正的并发执行；结果按完成顺序回到主协程，由它独占修改 db，不需要锁
+    tasks = [asyncio.create_task(process_batch(words, i+1)) for i, words in enumerate(batches)]
+    writer = asyncio.create_task(db_writer())
+    try:
+        for fut in asyncio.as_completed(tasks):
+            for kanji, content in await fut:
                 if content:
-                    content = clean_markdown(content)
                     db["kanji"][kanji]["content"] = content
                     db["kanji"][kanji]["status"] = "completed"
                     db["meta"]["completed"] += 1
-                    completed[0] += 1
-                    save_db(db)
-                    print(f"[{completed[0]}/{total_pending}] 完成: {kanji}", file=sys.stderr)
+                    completed += 1
+                    print(f"[{completed}/{total_pending}] 完成: {kanji}", file=sys.stderr)
                 else:
                     db["kanji"][kanji]["status"] = "failed"
-                    save_db(db)
                     print(f"[失败] {kanji}", file=sys.stderr)
-
-    # 按年级顺序处理
-    pending_sorted = sorted(pending, key=lambda k: (db["kanji"][k]["grade"], k))
-
-    # 真正的并发执行
-    tasks = [process_one(kanji, i+1) for i, kanji in enumerate(pending_sorted)]
-    await asyncio.gather(*tasks)
+                unsaved += 1
+                if unsaved >= SAVE_EVERY:
+                    save_queue.put_nowait(snapshot_db(db))
+                    unsaved = 0
+    finally:
+        for task in tasks:
+            task.cancel()
+        save_queue.put_nowait(None)
+        await writer
+        # 中断/异常时也把未落盘的结果写回，保证断点续传；没有新改动就不必再序列化一遍
+        if unsaved:
+            save_db(db)
 
     print(f"\n完成: {db['meta']['completed']}/{db['meta']['total']}", file=sys.stderr)
 
 if __name__ == "__main__":
     concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 3
-    asyncio.run(batch_generate(concurrency))
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_BATCH_SIZE
+    asyncio.run(batch_generate(concurrency, batch_size))
@@ -1,15 +1,20 @@
 #!/usr/bin/env python3
 """批量生成日语汉字详解 - 结构化 JSON 版本"""
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+import functools
 import json
+import mmap
 import os
+import re
 import signal
 import shlex
 import shutil
 import sys
 from datetime import datetime
 from pathlib import Path
+from typing import Callable, Iterator
 
 from kanji_memory_contract import validate_memory_payload
 from kanji_pronunciation_audit import repair_memory_payload_pronunciations
@@ -20,6 +25,11 @@ try:
 except ImportError:  # pragma: no cover
     repair_json = None
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 SCRIPT_DIR = Path(__file__).parent
 DATA_DIR = SCRIPT_DIR.parent / "data"
 REPO_ROOT = SCRIPT_DIR.parent
@@ -35,6 +45,8 @@ DEFAULT_CODEX_TIMEOUT_S = int(os.getenv("CODEX_TIMEOUT_S", "3600"))
 DEFAULT_BACKEND = os.getenv("KANJI_BACKEND") or os.getenv("AGENT_TYPE", "claude")
 DEFAULT_CODEX_BATCH_SIZE = int(os.getenv("CODEX_BATCH_SIZE", "10"))
 CODEX_BIN = os.getenv("CODEX_BIN", "codex")
+# 流式读取时只保留输出尾部用于报错
+STREAM_TAIL_BYTES = 4096
 VALID_BACKENDS = {"claude", "codex"}
 CODEX_MULTI_CONFIGS_ENV = "CODEX_MULTI_CONFIGS_JSON"
 DEFAULT_CODEX_MODEL = os.getenv("CODEX_MODEL") or "gpt-5.5"
@@ -57,6 +69,11 @@ def _env_path(name: str, default: Path) -> Path:
 
 
 DB_FILE = _env_path("KANJI_DB_FILE", DB_FILE)
+# 增量日志：每个结果追加一行，定期/退出时合并回 DB_FILE
+JOURNAL_FILE = DB_FILE.with_suffix(".journal")
+COMPACT_EVERY = 50
+# 专用的单线程写盘线程：序列化+写 DB 不占事件循环，也不和默认线程池里的其它任务抢
+DB_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kanji-db-writer")
 
 
 @dataclass(frozen=True)
@@ -66,10 +83,26 @@ class CodexRuntimeConfig:
     api_key: str
 
 
+def _loads_db(raw: bytes) -> dict:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def _dumps_db(obj, *, indent: bool = False) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=(orjson.OPT_INDENT_2 if indent else 0) | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+
 def init_db() -> dict:
-    """从旧数据库初始化新数据库结构"""
+    """从旧数据库初始化新数据库结构，并重放未合并的增量日志"""
+    db = _init_db_snapshot()
+    replay_journal(db)
+    return db
+
+
+def _init_db_snapshot() -> dict:
     if DB_FILE.exists():
-        return json.loads(DB_FILE.read_text(encoding="utf-8"))
+        return _loads_db(DB_FILE.read_bytes())
 
     source = os.getenv("KANJI_SOURCE", "").strip().lower()
     if source:
@@ -151,18 +184,129 @@ def _build_initial_db_from_kanji_list(
 
 
 def save_db(db: dict):
+    """写出完整快照；快照已包含日志里的所有结果，随后清空日志"""
     db["meta"]["last_updated"] = datetime.now().isoformat()
-    DB_FILE.write_text(json.dumps(db, ensure_ascii=False, indent=2), encoding="utf-8")
+    write_snapshot(db, indent=True)
+    if JOURNAL_FILE.exists():
+        JOURNAL_FILE.write_bytes(b"")
+
+
+def write_snapshot(db: dict, *, indent: bool = False) -> None:
+    """先写临时文件再 os.replace，中途中断也不会留下半截 DB
+
+    运行中的定期合并用紧凑格式；最终 save_db 才缩进，保持仓库里的 DB 便于 diff。
+    """
+    tmp_path = DB_FILE.with_suffix(DB_FILE.suffix + ".tmp")
+    tmp_path.write_bytes(_dumps_db(db, indent=indent))
+    os.replace(tmp_path, DB_FILE)
+
+
+def snapshot_db(db: dict) -> dict:
+    """复制出可在后台线程序列化的快照（只复制到条目层，data 整体替换、不会原地修改）"""
+    return {**db, "meta": dict(db["meta"]), "kanji": {k: dict(v) for k, v in db["kanji"].items()}}
+
+
+def drop_journal_prefix(journal, size: int):
+    """删掉已写进快照的前 size 字节日志，保留快照之后追加的记录；返回新的追加句柄
+
+    剩余部分先写临时文件并 fsync，再 os.replace 覆盖日志，任何时刻崩溃日志都是完整的。
+    传入的句柄会被关闭（Windows 上不能替换仍打开的文件）；替换失败时原日志不变。
+    """
+    with JOURNAL_FILE.open("rb") as f:
+        f.seek(size)
+        tail = f.read()
+    tmp_path = JOURNAL_FILE.with_suffix(JOURNAL_FILE.suffix + ".tmp")
+    try:
+        with tmp_path.open("wb") as f:
+            f.write(tail)
+            f.flush()
+            os.fsync(f.fileno())
+        journal.close()
+        os.replace(tmp_path, JOURNAL_FILE)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return JOURNAL_FILE.open("ab", buffering=0)
+
+
+def snapshot_has_kanji(kanji: str) -> bool | None:
+    """不解析整个快照，直接在字节里找 `"字":` 这个键；快照不存在时返回 None
+
+    JSON 字符串内部不会出现未转义的引号，而 data 里的键都是英文字段名，
+    所以 `"字":` 只可能是 db["kanji"] 的键。
+    """
+    if not DB_FILE.exists() or DB_FILE.stat().st_size == 0:
+        return None
+    key = json.dumps(kanji, ensure_ascii=False).encode("utf-8") + b":"
+    with DB_FILE.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return mm.find(key) != -1
+
+
+def apply_result(db: dict, kanji: str, data: dict | None, error: str) -> None:
+    entry = db["kanji"][kanji]
+    if data:
+        was_completed = entry["status"] == "completed"
+        entry["data"] = data
+        entry["status"] = "completed"
+        entry.pop("error", None)
+        if not was_completed:
+            db["meta"]["completed"] += 1
+    else:
+        entry["status"] = "failed"
+        entry["error"] = error  # 保存错误信息
+
+
+def persist_one_result(db: dict | None, kanji: str, data: dict | None, error: str) -> bool:
+    """单字模式的落盘：重放日志后立即写快照，读快照的工具（make_epub_v2 等）马上可见
+
+    失败结果不会覆盖已完成的条目；返回是否写入了 DB。
+    """
+    if db is None:
+        db = init_db()  # 查询走快速路径，写入时才回退到完整加载
+    if not data and db["kanji"][kanji]["status"] == "completed":
+        return False
+    apply_result(db, kanji, data, error)
+    save_db(db)
+    return True
+
+
+def append_journal(journal, kanji: str, data: dict | None, error: str) -> None:
+    record = {"k": kanji, "d": data} if data else {"k": kanji, "e": error}
+    journal.write(_dumps_db(record) + b"\n")
+
+
+def replay_journal(db: dict) -> int:
+    """把日志里的结果按顺序重放到 db 上，返回重放条数；apply_result 幂等，重复重放无害"""
+    if not JOURNAL_FILE.exists():
+        return 0
+    replayed = 0
+    with JOURNAL_FILE.open("rb") as f:
+        for line in f:
+            try:
+                record = _loads_db(line)
+            except ValueError:  # orjson/json 的解码错误都是 ValueError
+                continue  # 中断时写了一半的最后一行
+            kanji = record.get("k")
+            if kanji not in db["kanji"]:
+                continue
+            apply_result(db, kanji, record.get("d"), record.get("e", ""))
+            replayed += 1
+    return replayed
+
+
+@functools.cache
+def _template_parts(path: Path, placeholder: str) -> tuple[str, ...]:
+    """模板只读一次，按占位符预先切好，之后每次只需 join"""
+    return tuple(path.read_text(encoding="utf-8").split(placeholder))
 
 
 def load_prompt(kanji: str) -> str:
-    template = PROMPT_TEMPLATE.read_text(encoding="utf-8")
-    return template.replace("{kanji}", kanji)
+    return kanji.join(_template_parts(PROMPT_TEMPLATE, "{kanji}"))
 
 
 def load_batch_prompt(kanji_list: list[str]) -> str:
-    template = BATCH_PROMPT_TEMPLATE.read_text(encoding="utf-8")
-    return template.replace("{kanji_json}", json.dumps({"kanji": kanji_list}, ensure_ascii=False))
+    kanji_json = json.dumps({"kanji": kanji_list}, ensure_ascii=False)
+    return kanji_json.join(_template_parts(BATCH_PROMPT_TEMPLATE, "{kanji_json}"))
 
 
 def _load_codex_base_args() -> list[str]:
@@ -209,13 +353,11 @@ def _read_codex_config_lines() -> list[str]:
     return args
 
 
+_APPROVAL_OVERRIDE_FLAGS = frozenset({"--yolo", "--bypass-approvals-and-sandbox", "-a", "--ask-for-approval"})
+
+
 def _has_approval_override(args: list[str]) -> bool:
-    return (
-        "--yolo" in args
-        or "--bypass-approvals-and-sandbox" in args
-        or "-a" in args
-        or "--ask-for-approval" in args
-    )
+    return not _APPROVAL_OVERRIDE_FLAGS.isdisjoint(args)
 
 
 def _first_nonempty_string(mapping: dict, *keys: str) -> str:
@@ -312,31 +454,37 @@ def _build_codex_env(runtime_config: CodexRuntimeConfig | None) -> dict[str, str
     return env
 
 
-def _build_codex_cmd(prompt: str, runtime_config: CodexRuntimeConfig | None = None) -> list[str]:
-    base_cmd = [CODEX_BIN]
+@functools.cache
+def _codex_launcher() -> tuple[str, ...]:
     resolved = shutil.which(CODEX_BIN)
     if not resolved and os.name == "nt" and not CODEX_BIN.lower().endswith(".ps1"):
         resolved = shutil.which(f"{CODEX_BIN}.ps1")
-    if resolved:
-        if os.name == "nt":
-            lower = resolved.lower()
-            if lower.endswith(".ps1"):
-                base_cmd = ["powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-File", resolved]
-            elif lower.endswith(".cmd") or lower.endswith(".bat"):
-                base_cmd = ["cmd.exe", "/c", resolved]
-            else:
-                base_cmd = [resolved]
-        else:
-            base_cmd = [resolved]
+    if not resolved:
+        return (CODEX_BIN,)
+    if os.name == "nt":
+        lower = resolved.lower()
+        if lower.endswith(".ps1"):
+            return ("powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-File", resolved)
+        if lower.endswith(".cmd") or lower.endswith(".bat"):
+            return ("cmd.exe", "/c", resolved)
+    return (resolved,)
+
+
+@functools.cache
+def _runtime_codex_cmd_prefix(runtime_config: CodexRuntimeConfig) -> tuple[str, ...]:
+    cmd = [*_codex_launcher(), "--yolo", "exec", "--skip-git-repo-check", "--json"]
+    for line in _build_runtime_codex_config_lines(runtime_config):
+        cmd.extend(["-c", line])
+    return tuple(cmd)
 
-    cmd = base_cmd
-    if runtime_config is not None:
-        cmd.extend(["--yolo", "exec", "--skip-git-repo-check", "--json"])
-        for line in _build_runtime_codex_config_lines(runtime_config):
-            cmd.extend(["-c", line])
-        cmd.append(prompt)
-        return cmd
 
+# 以下环境变量决定默认 codex 命令前缀；作为缓存键，环境变化时自动重新构建
+_CODEX_CMD_ENV_KEYS = ("CODEX_ARGS_JSON", "CODEX_ARGS", "CODEX_CONFIG_FILE", "CODEX_MODEL")
+
+
+@functools.cache
+def _default_codex_cmd_prefix(_env: tuple[str | None, ...]) -> tuple[str, ...]:
+    cmd = list(_codex_launcher())
     base_args = _load_codex_base_args()
     cmd.extend(base_args)
     if not _has_approval_override(base_args):
@@ -345,33 +493,73 @@ def _build_codex_cmd(prompt: str, runtime_config: CodexRuntimeConfig | None = No
     model = os.getenv("CODEX_MODEL")
     if model:
         cmd.extend(["-m", model])
-    cmd.append(prompt)
-    return cmd
+    return tuple(cmd)
 
 
-def _extract_codex_agent_message(text: str) -> str | None:
+def _build_codex_cmd(prompt: str, runtime_config: CodexRuntimeConfig | None = None) -> list[str]:
+    if runtime_config is not None:
+        return [*_runtime_codex_cmd_prefix(runtime_config), prompt]
+    env = tuple(os.getenv(key) for key in _CODEX_CMD_ENV_KEYS)
+    return [*_default_codex_cmd_prefix(env), prompt]
+
+
+_CODEX_RESULT_EVENT_TYPES = ("item.completed", "response.completed")
+_CODEX_RESULT_EVENT_TYPES_BYTES = tuple(t.encode() for t in _CODEX_RESULT_EVENT_TYPES)
+
+
+def _codex_event_message(line: str | bytes) -> str | None:
+    """单行 codex --json 事件里的回复文本；不是完成事件时返回 None"""
+    item_marker, response_marker = (
+        _CODEX_RESULT_EVENT_TYPES_BYTES if isinstance(line, bytes) else _CODEX_RESULT_EVENT_TYPES
+    )
+    # 绝大多数事件是增量/日志，先做子串筛选，只对完成事件做 JSON 解码
+    if item_marker not in line and response_marker not in line:
+        return None
+    try:
+        event = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    if event.get("type") == "item.completed":
+        item = event.get("item", {})
+        if item.get("type") == "agent_message" and item.get("text"):
+            return item["text"]
+    elif event.get("type") == "response.completed":
+        response = event.get("response", {})
+        if response.get("output_text"):
+            return response["output_text"]
+    return None
+
+
+def _extract_codex_agent_message(text: str | bytes) -> str | None:
+    """从 codex --json 事件流里取最后一条回复；str/bytes 均可"""
     last_text = None
     for line in text.splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        try:
-            event = json.loads(line)
-        except json.JSONDecodeError:
-            continue
-        if event.get("type") == "item.completed":
-            item = event.get("item", {})
-            if item.get("type") == "agent_message" and item.get("text"):
-                last_text = item["text"]
-        elif event.get("type") == "response.completed":
-            response = event.get("response", {})
-            if response.get("output_text"):
-                last_text = response["output_text"]
+        message = _codex_event_message(line)
+        if message:
+            last_text = message
     return last_text
 
 
+# JSON 字符串字面量（含引号，未闭合时吃到文本末尾）；外层分组让 split 保留字面量
+_JSON_STRING_SPLIT_RE = re.compile(r'("[^"\\]*(?:\\.[^"\\]*)*"?)', re.S)
+
+
 def _escape_unescaped_control_chars_in_strings(text: str) -> str:
     """修复字符串内未转义的换行/tab 等，减少 JSON 解析失败"""
+    if "\n" not in text and "\r" not in text and "\t" not in text:
+        return text
+    if "\\\n" in text or "\\\r" in text or "\\\t" in text:
+        # 反斜杠后紧跟控制字符时要按转义状态逐字判断，走慢路径
+        return _escape_control_chars_char_by_char(text)
+    parts = _JSON_STRING_SPLIT_RE.split(text)
+    parts[1::2] = [
+        literal.replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t")
+        for literal in parts[1::2]
+    ]
+    return "".join(parts)
+
+
+def _escape_control_chars_char_by_char(text: str) -> str:
     out: list[str] = []
     in_string = False
     escaped = False
@@ -408,24 +596,21 @@ def _escape_unescaped_control_chars_in_strings(text: str) -> str:
     return "".join(out)
 
 
-def _extract_fenced_code_blocks(text: str) -> list[str]:
-    lines = text.splitlines()
-    blocks: list[str] = []
-    i = 0
-    while i < len(lines):
-        if lines[i].lstrip().startswith("```"):
-            j = i + 1
-            while j < len(lines) and lines[j].strip() != "```":
-                j += 1
-            if j < len(lines):
-                content = lines[i + 1 : j]
-                if content and content[0].strip().lower() in ("json", ""):
-                    content = content[1:]
-                blocks.append("\n".join(content).strip())
-                i = j + 1
-                continue
-        i += 1
-    return blocks
+# 开头行去掉前导空白后以 ``` 开始（可带语言标记），结束行去掉空白后恰好是 ```
+_FENCE_RE = re.compile(r"^[^\S\n]*```[^\n]*\n(.*?)^[^\S\n]*```[^\S\n]*$", re.M | re.S)
+
+
+def _iter_fenced_code_blocks(text: str) -> Iterator[str]:
+    if "```" not in text:
+        return
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    for match in _FENCE_RE.finditer(text):
+        content = match.group(1)
+        first, _, rest = content.partition("\n")
+        if first.strip().lower() in ("json", ""):
+            content = rest
+        yield content.strip()
 
 
 def _extract_braced_json(text: str) -> str | None:
@@ -436,26 +621,38 @@ def _extract_braced_json(text: str) -> str | None:
     return text[start : end + 1].strip()
 
 
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _iter_json_candidates(text: str) -> Iterator[str]:
+    """按优先级惰性产出候选：原文 → fenced code block → 首尾花括号之间；解析成功即停止"""
+    yield text
+    yield from _iter_fenced_code_blocks(text)
+    braced = _extract_braced_json(text)
+    if braced:
+        yield braced
+
+
+def _iter_decode_attempts(cand: str) -> Iterator[str]:
+    yield cand
+    escaped = _escape_unescaped_control_chars_in_strings(cand)
+    if escaped != cand:
+        yield escaped
+
+
 def parse_json(text: str) -> dict | None:
     """从响应中提取 JSON（兼容前后文本/markdown code fence/未转义换行）"""
     text = text.strip()
     if not text:
         return None
 
-    candidates = [text]
-    candidates.extend(_extract_fenced_code_blocks(text))
-    braced = _extract_braced_json(text)
-    if braced:
-        candidates.append(braced)
-
-    decoder = json.JSONDecoder()
-    for cand in candidates:
+    for cand in _iter_json_candidates(text):
         cand = cand.strip()
         if not cand:
             continue
-        for attempt in (cand, _escape_unescaped_control_chars_in_strings(cand)):
+        for attempt in _iter_decode_attempts(cand):
             try:
-                obj, _ = decoder.raw_decode(attempt)
+                obj, _ = _JSON_DECODER.raw_decode(attempt)
             except json.JSONDecodeError:
                 if repair_json:
                     try:
@@ -505,7 +702,8 @@ def parse_batch_response(text: str, requested_kanji: list[str]) -> tuple[dict[st
     return parsed, ""
 
 
-async def _call_claude(prompt: str, timeout_s: int) -> tuple[int, str, str]:
+async def _call_claude(prompt: str, timeout_s: int) -> tuple[int, bytes, bytes]:
+    """返回原始字节；只有要解析的 stdout 才整体解码，报错时只解码尾部"""
     cmd = ["claude", "-p", "--output-format", "text", "--max-turns", "3", prompt]
     proc = await asyncio.create_subprocess_exec(
         *cmd,
@@ -517,38 +715,115 @@ async def _call_claude(prompt: str, timeout_s: int) -> tuple[int, str, str]:
         stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout_s)
     except asyncio.TimeoutError:
         stdout, stderr = await _kill_timed_out_process(proc)
-        return 124, stdout.decode(errors="replace"), stderr.decode(errors="replace")
-    return proc.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+        return 124, stdout, stderr
+    return proc.returncode, stdout, stderr
+
+
+def _tail_text(data: bytes, chars: int) -> str:
+    # UTF-8 每字符最多 4 字节，先按字节截再解码，避免解码整个输出
+    return data[-4 * chars :].decode(errors="replace")[-chars:]
 
 
 def _subprocess_group_kwargs() -> dict:
     return {"start_new_session": True} if os.name != "nt" else {}
 
 
+def _signal_process_group_kill(pid: int, kill: Callable[[], None]) -> None:
+    try:
+        if os.name == "nt":
+            kill()
+        else:
+            os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
 async def _kill_timed_out_process(proc: asyncio.subprocess.Process) -> tuple[bytes, bytes]:
     if proc.returncode is None:
-        try:
-            if os.name == "nt":
-                proc.kill()
-            else:
-                os.killpg(proc.pid, signal.SIGKILL)
-        except ProcessLookupError:
-            pass
+        _signal_process_group_kill(proc.pid, proc.kill)
     try:
         return await asyncio.wait_for(proc.communicate(), timeout=5)
     except asyncio.TimeoutError:
         return b"", b""
 
 
+@dataclass(frozen=True)
+class CodexCallResult:
+    returncode: int
+    message: str | None
+    stdout_len: int
+    stdout_tail: str
+    stderr_tail: str
+
+
+class _CodexEventProtocol(asyncio.SubprocessProtocol):
+    """直接在管道数据回调里切行、筛选完成事件，不经过 StreamReader，也不用每行 await"""
+
+    def __init__(self, finished: asyncio.Future):
+        self.finished = finished
+        self.transport: asyncio.SubprocessTransport | None = None
+        self.message: str | None = None
+        self.stdout_len = 0
+        self.stdout_tail = b""
+        self.stderr_tail = b""
+        self._partial_line = bytearray()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def pipe_data_received(self, fd: int, data: bytes):
+        if fd == 2:
+            self.stderr_tail = (self.stderr_tail + data)[-STREAM_TAIL_BYTES:]
+            return
+        self.stdout_len += len(data)
+        self.stdout_tail = (self.stdout_tail + data)[-STREAM_TAIL_BYTES:]
+        self._partial_line += data
+        end = self._partial_line.rfind(b"\n")
+        if end == -1:
+            return
+        lines = bytes(self._partial_line[:end]).split(b"\n")
+        del self._partial_line[: end + 1]
+        for line in lines:
+            self._handle_line(line)
+
+    def pipe_connection_lost(self, fd: int, exc: Exception | None):
+        if fd == 1 and self._partial_line:
+            self._handle_line(bytes(self._partial_line))
+            self._partial_line.clear()
+
+    def connection_lost(self, exc: Exception | None):
+        # 进程退出且所有管道关闭后才会调用，此时输出已经读完
+        if not self.finished.done():
+            self.finished.set_result(None)
+
+    def _handle_line(self, line: bytes):
+        message = _codex_event_message(line)
+        if message:
+            self.message = message
+
+    def result(self, returncode: int) -> CodexCallResult:
+        return CodexCallResult(
+            returncode=returncode,
+            message=self.message,
+            stdout_len=self.stdout_len,
+            stdout_tail=self.stdout_tail.decode(errors="replace"),
+            stderr_tail=self.stderr_tail.decode(errors="replace"),
+        )
+
+
 async def _call_codex(
-    prompt: str,
+    prompt: str | bytes,
     timeout_s: int,
     runtime_config: CodexRuntimeConfig | None = None,
-) -> tuple[int, str, str]:
+) -> CodexCallResult:
+    """流式处理 codex 事件流，只保留最后一条回复和用于报错的尾部，不缓存整个输出"""
     effective_runtime_config = runtime_config or _default_codex_runtime_config()
     cmd = _build_codex_cmd("-", runtime_config=effective_runtime_config)
     env = _build_codex_env(effective_runtime_config)
-    proc = await asyncio.create_subprocess_exec(
+    loop = asyncio.get_running_loop()
+    finished = loop.create_future()
+    transport, protocol = await loop.subprocess_exec(
+        lambda: _CodexEventProtocol(finished),
         *cmd,
         stdin=asyncio.subprocess.PIPE,
         stdout=asyncio.subprocess.PIPE,
@@ -557,25 +832,38 @@ async def _call_codex(
         **_subprocess_group_kwargs(),
     )
     try:
-        stdout, stderr = await asyncio.wait_for(
-            proc.communicate(input=prompt.encode()),
-            timeout=timeout_s,
-        )
-    except asyncio.TimeoutError:
-        stdout, stderr = await _kill_timed_out_process(proc)
-        return 124, stdout.decode(errors="replace"), stderr.decode(errors="replace")
-    return proc.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+        stdin = transport.get_pipe_transport(0)
+        stdin.write(prompt.encode() if isinstance(prompt, str) else prompt)
+        stdin.close()
+        try:
+            await asyncio.wait_for(asyncio.shield(finished), timeout=timeout_s)
+        except asyncio.TimeoutError:
+            if transport.get_returncode() is None:
+                _signal_process_group_kill(transport.get_pid(), transport.kill)
+            try:
+                await asyncio.wait_for(finished, timeout=5)
+            except asyncio.TimeoutError:
+                pass
+            return protocol.result(124)
+        return protocol.result(transport.get_returncode())
+    finally:
+        transport.close()
 
 
-async def run_claude_once(kanji: str, timeout_s: int) -> tuple[dict | None, str]:
-    """单次调用 claude CLI，返回 (解析结果, 错误信息)"""
-    code, stdout_text, stderr_text = await _call_claude(load_prompt(kanji), timeout_s)
+async def run_claude_once(
+    kanji: str,
+    timeout_s: int,
+    prompt: str | None = None,
+) -> tuple[dict | None, str]:
+    """单次调用 claude CLI，返回 (解析结果, 错误信息)；重试时可传入已构建好的 prompt"""
+    code, stdout, stderr = await _call_claude(prompt or load_prompt(kanji), timeout_s)
     if code == 124:
         return None, f"timeout_after={timeout_s}s"
     if code != 0:
-        stderr_tail = stderr_text[-200:].replace("\n", "\\n")
+        stderr_tail = _tail_text(stderr, 200).replace("\n", "\\n")
         return None, f"exit_code={code}, stderr_tail={stderr_tail}"
 
+    stdout_text = stdout.decode(errors="replace")
     data = parse_json(stdout_text)
     if data is None:
         tail = stdout_text[-300:].replace("\n", "\\n")
@@ -588,23 +876,24 @@ async def run_codex_once(
     kanji: str,
     timeout_s: int,
     runtime_config: CodexRuntimeConfig | None = None,
+    prompt: bytes | None = None,
 ) -> tuple[dict | None, str]:
-    """单次调用 codex CLI，返回 (解析结果, 错误信息)"""
-    code, stdout_text, stderr_text = await _call_codex(
-        load_prompt(kanji),
+    """单次调用 codex CLI，返回 (解析结果, 错误信息)；重试时可传入已编码的 prompt"""
+    call = await _call_codex(
+        prompt or load_prompt(kanji).encode(),
         timeout_s,
         runtime_config=runtime_config,
     )
-    if code == 124:
+    if call.returncode == 124:
         return None, f"timeout_after={timeout_s}s"
-    if code != 0:
-        stderr_tail = stderr_text[-200:].replace("\n", "\\n")
-        return None, f"exit_code={code}, stderr_tail={stderr_tail}"
+    if call.returncode != 0:
+        stderr_tail = call.stderr_tail[-200:].replace("\n", "\\n")
+        return None, f"exit_code={call.returncode}, stderr_tail={stderr_tail}"
 
-    message = _extract_codex_agent_message(stdout_text)
+    message = call.message
     if not message:
-        tail = stdout_text[-300:].replace("\n", "\\n")
-        return None, f"codex_no_agent_message, len={len(stdout_text)}, tail={tail}"
+        tail = call.stdout_tail[-300:].replace("\n", "\\n")
+        return None, f"codex_no_agent_message, len={call.stdout_len}, tail={tail}"
 
     data = parse_json(message)
     if data is None:
@@ -625,9 +914,10 @@ async def run_claude(
     max_retries: int = 2,
 ) -> tuple[str, dict | None, str]:
     """带重试的 claude CLI 调用"""
+    prompt = load_prompt(kanji)
     last_error = ""
     for attempt in range(max_retries + 1):
-        data, error = await run_claude_once(kanji, timeout_s=timeout_s)
+        data, error = await run_claude_once(kanji, timeout_s=timeout_s, prompt=prompt)
         if data:
             return kanji, data, ""
         last_error = error
@@ -644,12 +934,14 @@ async def run_codex(
     runtime_config: CodexRuntimeConfig | None = None,
 ) -> tuple[str, dict | None, str]:
     """带重试的 codex CLI 调用"""
+    prompt = load_prompt(kanji).encode()
     last_error = ""
     for attempt in range(max_retries + 1):
         data, error = await run_codex_once(
             kanji,
             timeout_s=timeout_s,
             runtime_config=runtime_config,
+            prompt=prompt,
         )
         if data:
             return kanji, data, ""
@@ -684,23 +976,23 @@ async def run_codex_batch_once(
     kanji_batch: list[str],
     timeout_s: int,
     runtime_config: CodexRuntimeConfig | None = None,
+    prompt: bytes | None = None,
 ) -> tuple[dict[str, dict], str]:
-    code, stdout_text, stderr_text = await _call_codex(
-        load_batch_prompt(kanji_batch),
+    call = await _call_codex(
+        prompt or load_batch_prompt(kanji_batch).encode(),
         timeout_s,
         runtime_config=runtime_config,
     )
-    if code == 124:
+    if call.returncode == 124:
         return {}, f"timeout_after={timeout_s}s"
-    if code != 0:
-        stderr_tail = stderr_text[-200:].replace("\n", "\\n")
-        return {}, f"exit_code={code}, stderr_tail={stderr_tail}"
+    if call.returncode != 0:
+        stderr_tail = call.stderr_tail[-200:].replace("\n", "\\n")
+        return {}, f"exit_code={call.returncode}, stderr_tail={stderr_tail}"
 
-    message = _extract_codex_agent_message(stdout_text)
-    if not message:
-        tail = stdout_text[-300:].replace("\n", "\\n")
-        return {}, f"codex_no_agent_message, len={len(stdout_text)}, tail={tail}"
-    return parse_batch_response(message, kanji_batch)
+    if not call.message:
+        tail = call.stdout_tail[-300:].replace("\n", "\\n")
+        return {}, f"codex_no_agent_message, len={call.stdout_len}, tail={tail}"
+    return parse_batch_response(call.message, kanji_batch)
 
 
 async def run_codex_batch(
@@ -709,12 +1001,14 @@ async def run_codex_batch(
     max_retries: int = 2,
     runtime_config: CodexRuntimeConfig | None = None,
 ) -> tuple[dict[str, dict], str]:
+    prompt = load_batch_prompt(kanji_batch).encode()
     last_error = ""
     for attempt in range(max_retries + 1):
         parsed, error = await run_codex_batch_once(
             kanji_batch,
             timeout_s=timeout_s,
             runtime_config=runtime_config,
+            prompt=prompt,
         )
         if parsed:
             return parsed, ""
@@ -726,6 +1020,60 @@ async def run_codex_batch(
     return {}, last_error
 
 
+async def run_claude_batch_once(
+    kanji_batch: list[str],
+    timeout_s: int,
+    prompt: str | None = None,
+) -> tuple[dict[str, dict], str]:
+    """一次 claude CLI 调用生成整批汉字，摊薄每次启动 CLI 的开销"""
+    code, stdout, stderr = await _call_claude(prompt or load_batch_prompt(kanji_batch), timeout_s)
+    if code == 124:
+        return {}, f"timeout_after={timeout_s}s"
+    if code != 0:
+        stderr_tail = _tail_text(stderr, 200).replace("\n", "\\n")
+        return {}, f"exit_code={code}, stderr_tail={stderr_tail}"
+    return parse_batch_response(stdout.decode(errors="replace"), kanji_batch)
+
+
+async def run_claude_batch(
+    kanji_batch: list[str],
+    timeout_s: int,
+    max_retries: int = 2,
+) -> tuple[dict[str, dict], str]:
+    prompt = load_batch_prompt(kanji_batch)
+    last_error = ""
+    for attempt in range(max_retries + 1):
+        parsed, error = await run_claude_batch_once(kanji_batch, timeout_s=timeout_s, prompt=prompt)
+        if parsed:
+            return parsed, ""
+        last_error = error
+        if attempt < max_retries:
+            label = "".join(kanji_batch)
+            print(f"  [批量重试 {attempt+1}/{max_retries}] {label}: {error[:80]}", file=sys.stderr)
+            await asyncio.sleep(1)
+    return {}, last_error
+
+
+async def run_backend_batch(
+    backend: str,
+    kanji_batch: list[str],
+    timeout_s: int,
+    max_retries: int = 2,
+    runtime_config: CodexRuntimeConfig | None = None,
+) -> tuple[dict[str, dict], str]:
+    backend = backend.lower()
+    if backend == "claude":
+        return await run_claude_batch(kanji_batch, timeout_s=timeout_s, max_retries=max_retries)
+    if backend == "codex":
+        return await run_codex_batch(
+            kanji_batch,
+            timeout_s=timeout_s,
+            max_retries=max_retries,
+            runtime_config=runtime_config,
+        )
+    return {}, f"unknown_backend={backend}"
+
+
 def _chunked(items: list[str], size: int) -> list[list[str]]:
     if size <= 1:
         return [[item] for item in items]
@@ -739,6 +1087,24 @@ def _allocate_codex_worker_counts(concurrency: int, config_count: int) -> list[i
     return [base + (1 if idx < extra else 0) for idx in range(config_count)]
 
 
+async def _run_queue_workers(items: list, concurrency: int, handle) -> None:
+    """固定 concurrency 个 worker 从队列取任务，调用 handle(item, idx)，idx 从 1 开始"""
+    queue: asyncio.Queue = asyncio.Queue()
+    for i, item in enumerate(items, start=1):
+        queue.put_nowait((item, i))
+
+    async def worker():
+        while True:
+            try:
+                item, idx = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await handle(item, idx)
+
+    worker_count = max(1, min(concurrency, len(items)))
+    await asyncio.gather(*(worker() for _ in range(worker_count)))
+
+
 async def batch_generate(
     concurrency: int = 3,
     limit: int = 0,
@@ -750,34 +1116,50 @@ async def batch_generate(
     """并发生成，写入 JSON 数据库"""
     backend = backend.lower()
     db = init_db()
+    # init_db 已重放日志；日志非空说明上次没合并完，退出前要把完整快照写回去
+    journal_dirty = JOURNAL_FILE.exists() and JOURNAL_FILE.stat().st_size > 0
     pending_sorted = _select_kanji_queue(db, include_failed=include_failed)
     if limit > 0:
         pending_sorted = pending_sorted[:limit]
 
     if not pending_sorted:
+        if journal_dirty:
+            save_db(db)
         print("所有汉字已完成！", file=sys.stderr)
         return
 
     total = len(pending_sorted)
     lock = asyncio.Lock()
     done = [0]
+    unsaved = [0]
+    journal = [JOURNAL_FILE.open("ab", buffering=0)]  # 合并后会换成新句柄
+    compaction: list[asyncio.Task | None] = [None]  # 同一时间至多一个后台合并
+
+    async def compact(snapshot: dict, journal_size: int):
+        await asyncio.get_running_loop().run_in_executor(DB_WRITER, write_snapshot, snapshot)
+        try:
+            journal[0] = drop_journal_prefix(journal[0], journal_size)
+        finally:
+            if journal[0].closed:  # 替换失败：原日志完好，重新打开继续追加
+                journal[0] = JOURNAL_FILE.open("ab", buffering=0)
 
     async def persist_result(kanji: str, data: dict | None, error: str):
+        # 锁只保护内存修改和日志追加；整库序列化在后台线程里做，不阻塞其它 worker
         async with lock:
+            apply_result(db, kanji, data, error)
+            append_journal(journal[0], kanji, data, error)
+            unsaved[0] += 1
+            if unsaved[0] >= COMPACT_EVERY and (compaction[0] is None or compaction[0].done()):
+                if compaction[0] is not None and compaction[0].exception() is not None:
+                    # 上次合并失败不丢数据（记录还在日志里），报出来后照常重试
+                    print(f"[警告] 后台合并失败: {compaction[0].exception()!r}", file=sys.stderr)
+                db["meta"]["last_updated"] = datetime.now().isoformat()
+                compaction[0] = asyncio.create_task(compact(snapshot_db(db), journal[0].tell()))
+                unsaved[0] = 0
             if data:
-                was_completed = db["kanji"][kanji]["status"] == "completed"
-                db["kanji"][kanji]["data"] = data
-                db["kanji"][kanji]["status"] = "completed"
-                db["kanji"][kanji].pop("error", None)
-                if not was_completed:
-                    db["meta"]["completed"] += 1
                 done[0] += 1
-                save_db(db)
                 print(f"[{done[0]}/{total}] 完成: {kanji}", file=sys.stderr)
             else:
-                db["kanji"][kanji]["status"] = "failed"
-                db["kanji"][kanji]["error"] = error  # 保存错误信息
-                save_db(db)
                 print(f"[失败] {kanji} | {error}", file=sys.stderr)
 
     async def process(kanji: str, idx: int):
@@ -793,43 +1175,98 @@ async def batch_generate(
         for kanji in kanji_batch:
             await persist_result(kanji, None, error)
 
-    if backend == "codex" and batch_size > 1:
-        batches = _chunked(pending_sorted, batch_size)
-        codex_runtime_configs = _load_codex_runtime_configs()
-        if codex_runtime_configs:
+    try:
+        if batch_size > 1:
+            batches = _chunked(pending_sorted, batch_size)
+            codex_runtime_configs = _load_codex_runtime_configs() if backend == "codex" else []
+            if codex_runtime_configs:
+                worker_counts = _allocate_codex_worker_counts(concurrency, len(codex_runtime_configs))
+                distribution = ", ".join(
+                    f"{cfg.name}={count}" for cfg, count in zip(codex_runtime_configs, worker_counts)
+                )
+                print(
+                    f"待生成: {total} 个汉字，批大小: {batch_size}, 批数: {len(batches)}, "
+                    f"并发: {concurrency}, backend: {backend}, 配置分配: {distribution}",
+                    file=sys.stderr,
+                )
+                queue: asyncio.Queue[tuple[list[str], int]] = asyncio.Queue()
+                for i, kanji_batch in enumerate(batches, start=1):
+                    queue.put_nowait((kanji_batch, i))
+
+                async def batch_worker(runtime_config: CodexRuntimeConfig):
+                    while True:
+                        try:
+                            kanji_batch, idx = queue.get_nowait()
+                        except asyncio.QueueEmpty:
+                            return
+                        label = "".join(kanji_batch)
+                        print(
+                            f"[批 {idx}/{len(batches)}] 生成中: {label} @ {runtime_config.name}",
+                            file=sys.stderr,
+                        )
+                        data_by_kanji, error = await run_codex_batch(
+                            kanji_batch,
+                            timeout_s=timeout_s,
+                            runtime_config=runtime_config,
+                        )
+                        await persist_batch_result(kanji_batch, data_by_kanji, error)
+
+                tasks = [
+                    asyncio.create_task(batch_worker(runtime_config))
+                    for runtime_config, count in zip(codex_runtime_configs, worker_counts)
+                    for _ in range(count)
+                ]
+                await asyncio.gather(*tasks)
+                print(f"\n完成: {db['meta']['completed']}/{db['meta']['total']}", file=sys.stderr)
+                return
+
+            print(
+                f"待生成: {total} 个汉字，批大小: {batch_size}, 批数: {len(batches)}, "
+                f"并发: {concurrency}, backend: {backend}",
+                file=sys.stderr,
+            )
+
+            async def process_batch(kanji_batch: list[str], idx: int):
+                label = "".join(kanji_batch)
+                print(f"[批 {idx}/{len(batches)}] 生成中: {label}", file=sys.stderr)
+                data_by_kanji, error = await run_backend_batch(backend, kanji_batch, timeout_s=timeout_s)
+                await persist_batch_result(kanji_batch, data_by_kanji, error)
+
+            await _run_queue_workers(batches, concurrency, process_batch)
+            print(f"\n完成: {db['meta']['completed']}/{db['meta']['total']}", file=sys.stderr)
+            return
+
+        codex_runtime_configs = _load_codex_runtime_configs() if backend == "codex" else []
+        if backend == "codex" and codex_runtime_configs:
             worker_counts = _allocate_codex_worker_counts(concurrency, len(codex_runtime_configs))
             distribution = ", ".join(
                 f"{cfg.name}={count}" for cfg, count in zip(codex_runtime_configs, worker_counts)
             )
             print(
-                f"待生成: {total} 个汉字，批大小: {batch_size}, 批数: {len(batches)}, "
-                f"并发: {concurrency}, backend: {backend}, 配置分配: {distribution}",
+                f"待生成: {total} 个汉字，并发: {concurrency}, backend: {backend}, 配置分配: {distribution}",
                 file=sys.stderr,
             )
-            queue: asyncio.Queue[tuple[list[str], int]] = asyncio.Queue()
-            for i, kanji_batch in enumerate(batches, start=1):
-                queue.put_nowait((kanji_batch, i))
+            queue: asyncio.Queue[tuple[str, int]] = asyncio.Queue()
+            for i, kanji in enumerate(pending_sorted, start=1):
+                queue.put_nowait((kanji, i))
 
-            async def batch_worker(runtime_config: CodexRuntimeConfig):
+            async def worker(runtime_config: CodexRuntimeConfig):
                 while True:
                     try:
-                        kanji_batch, idx = queue.get_nowait()
+                        kanji, idx = queue.get_nowait()
                     except asyncio.QueueEmpty:
                         return
-                    label = "".join(kanji_batch)
-                    print(
-                        f"[批 {idx}/{len(batches)}] 生成中: {label} @ {runtime_config.name}",
-                        file=sys.stderr,
-                    )
-                    data_by_kanji, error = await run_codex_batch(
-                        kanji_batch,
+                    print(f"[{idx}/{total}] 生成中: {kanji} @ {runtime_config.name}", file=sys.stderr)
+                    _, data, error = await run_backend(
+                        backend,
+                        kanji,
                         timeout_s=timeout_s,
                         runtime_config=runtime_config,
                     )
-                    await persist_batch_result(kanji_batch, data_by_kanji, error)
+                    await persist_result(kanji, data, error)
 
             tasks = [
-                asyncio.create_task(batch_worker(runtime_config))
+                asyncio.create_task(worker(runtime_config))
                 for runtime_config, count in zip(codex_runtime_configs, worker_counts)
                 for _ in range(count)
             ]
@@ -837,84 +1274,32 @@ async def batch_generate(
             print(f"\n完成: {db['meta']['completed']}/{db['meta']['total']}", file=sys.stderr)
             return
 
-        print(
-            f"待生成: {total} 个汉字，批大小: {batch_size}, 批数: {len(batches)}, "
-            f"并发: {concurrency}, backend: {backend}",
-            file=sys.stderr,
-        )
-        sem = asyncio.Semaphore(concurrency)
-
-        async def process_batch_with_sem(kanji_batch: list[str], idx: int):
-            async with sem:
-                label = "".join(kanji_batch)
-                print(f"[批 {idx}/{len(batches)}] 生成中: {label}", file=sys.stderr)
-                data_by_kanji, error = await run_codex_batch(kanji_batch, timeout_s=timeout_s)
-                await persist_batch_result(kanji_batch, data_by_kanji, error)
-
-        tasks = [process_batch_with_sem(kanji_batch, i) for i, kanji_batch in enumerate(batches, start=1)]
-        await asyncio.gather(*tasks)
-        print(f"\n完成: {db['meta']['completed']}/{db['meta']['total']}", file=sys.stderr)
-        return
-
-    codex_runtime_configs = _load_codex_runtime_configs() if backend == "codex" else []
-    if backend == "codex" and codex_runtime_configs:
-        worker_counts = _allocate_codex_worker_counts(concurrency, len(codex_runtime_configs))
-        distribution = ", ".join(
-            f"{cfg.name}={count}" for cfg, count in zip(codex_runtime_configs, worker_counts)
-        )
-        print(
-            f"待生成: {total} 个汉字，并发: {concurrency}, backend: {backend}, 配置分配: {distribution}",
-            file=sys.stderr,
-        )
-        queue: asyncio.Queue[tuple[str, int]] = asyncio.Queue()
-        for i, kanji in enumerate(pending_sorted, start=1):
-            queue.put_nowait((kanji, i))
-
-        async def worker(runtime_config: CodexRuntimeConfig):
-            while True:
-                try:
-                    kanji, idx = queue.get_nowait()
-                except asyncio.QueueEmpty:
-                    return
-                print(f"[{idx}/{total}] 生成中: {kanji} @ {runtime_config.name}", file=sys.stderr)
-                _, data, error = await run_backend(
-                    backend,
-                    kanji,
-                    timeout_s=timeout_s,
-                    runtime_config=runtime_config,
-                )
-                await persist_result(kanji, data, error)
-
-        tasks = [
-            asyncio.create_task(worker(runtime_config))
-            for runtime_config, count in zip(codex_runtime_configs, worker_counts)
-            for _ in range(count)
-        ]
-        await asyncio.gather(*tasks)
+        print(f"待生成: {total} 个汉字，并发: {concurrency}, backend: {backend}", file=sys.stderr)
+        await _run_queue_workers(pending_sorted, concurrency, process)
         print(f"\n完成: {db['meta']['completed']}/{db['meta']['total']}", file=sys.stderr)
-        return
-
-    print(f"待生成: {total} 个汉字，并发: {concurrency}, backend: {backend}", file=sys.stderr)
-    sem = asyncio.Semaphore(concurrency)
-
-    async def process_with_sem(kanji: str, idx: int):
-        async with sem:
-            await process(kanji, idx)
-
-    tasks = [process_with_sem(kanji, i + 1) for i, kanji in enumerate(pending_sorted)]
-    await asyncio.gather(*tasks)
-    print(f"\n完成: {db['meta']['completed']}/{db['meta']['total']}", file=sys.stderr)
+    finally:
+        try:
+            if compaction[0] is not None:
+                await compaction[0]  # 合并失败要报出来，不能静默吞掉
+        finally:
+            journal[0].close()
+            # 后台合并写的是紧凑格式，且可能就发生在最后一个结果上（unsaved 归零），同样要落最终快照
+            if unsaved[0] or journal_dirty or compaction[0] is not None:
+                save_db(db)
 
 
 def render_all():
     """将所有已完成的汉字渲染为 Markdown（用于调试）"""
-    db = json.loads(DB_FILE.read_text(encoding="utf-8"))
+    db = _loads_db(DB_FILE.read_bytes())
+    replay_journal(db)
+    # 每个汉字编码一次、直接写底层缓冲区，绕开 print 的逐行文本层开销
+    sys.stdout.flush()
+    out = sys.stdout.buffer
     for kanji, entry in db["kanji"].items():
         if entry["status"] == "completed" and entry["data"]:
             md = render(kanji, entry["data"])
-            print(f"=== {kanji} ===")
-            print(md)
-            print()
+            out.write(f"=== {kanji} ===\n{md}\n\n".encode("utf-8"))
+    out.flush()
 
 
 def _pop_flag(args: list[str], flag: str) -> str | None:
@@ -948,8 +1333,11 @@ def _select_kanji_queue(db: dict, *, include_failed: bool) -> list[str]:
     allowed_statuses = {"pending"}
     if include_failed:
         allowed_statuses.add("failed")
-    queue = [k for k, v in db["kanji"].items() if v["status"] in allowed_statuses]
-    return sorted(queue, key=lambda k: (db["kanji"][k]["grade"], k))
+    # 直接排 (grade, kanji) 元组，比较在 C 里完成，不需要每次回查 db
+    return [
+        k
+        for _, k in sorted((v["grade"], k) for k, v in db["kanji"].items() if v["status"] in allowed_statuses)
+    ]
 
 
 if __name__ == "__main__":
@@ -966,6 +1354,10 @@ if __name__ == "__main__":
         render_all()
         sys.exit(0)
 
+    if argv and argv[0] == "compact":
+        save_db(init_db())
+        sys.exit(0)
+
     if backend not in VALID_BACKENDS:
         print(f"Unknown backend: {backend}", file=sys.stderr)
         sys.exit(2)
@@ -975,26 +1367,24 @@ if __name__ == "__main__":
         timeout = int(argv[2]) if len(argv) > 2 else _default_timeout_for_backend(backend)
 
         async def _one():
-            db = init_db()
-            if kanji not in db["kanji"]:
+            # 快照已存在时先在字节里查字，不加载整个 DB；生成完成后再完整加载写回
+            known = snapshot_has_kanji(kanji)
+            db = None
+            if known is None:
+                db = init_db()
+                known = kanji in db["kanji"]
+            if not known:
                 print(f"Unknown kanji: {kanji}", file=sys.stderr)
                 return
 
             print(f"[one] generating {kanji} (timeout={timeout}s, backend={backend})", file=sys.stderr)
             _, data, error = await run_backend(backend, kanji, timeout_s=timeout, max_retries=0)
+            saved = persist_one_result(db, kanji, data, error)
             if data:
-                was_completed = db["kanji"][kanji]["status"] == "completed"
-                db["kanji"][kanji]["data"] = data
-                db["kanji"][kanji]["status"] = "completed"
-                db["kanji"][kanji].pop("error", None)
-                if not was_completed:
-                    db["meta"]["completed"] += 1
-                save_db(db)
                 print(f"[one] OK: {kanji}", file=sys.stderr)
+            elif not saved:
+                print(f"[one] FAIL: {kanji} | {error} (kept existing result)", file=sys.stderr)
             else:
-                db["kanji"][kanji]["status"] = "failed"
-                db["kanji"][kanji]["error"] = error
-                save_db(db)
                 print(f"[one] FAIL: {kanji} | {error}", file=sys.stderr)
 
         asyncio.run(_one())
@@ -46,20 +46,29 @@ def _run_codex(prompt: str, model: str | None) -> str:
         cmd.extend(["-m", model])
     cmd.append(prompt)
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = subprocess.run(cmd, capture_output=True)
     if result.returncode != 0:
-        raise RuntimeError(f"codex 执行失败:\n{result.stderr}")
-
-    # 从 JSON 流中提取最后的 agent_message
-    for line in reversed(result.stdout.strip().splitlines()):
+        stderr = result.stderr.decode("utf-8", errors="replace")
+        raise RuntimeError(f"codex 执行失败:\n{stderr}")
+
+    # 从 JSON 流末尾往前逐行找最后的 agent_message：
+    # 目标几乎总在尾部，用 rfind 倒着切行，不必先把整个事件流拆成列表
+    buf = result.stdout
+    end = len(buf)
+    while end > 0:
+        start = buf.rfind(b"\n", 0, end)
+        line = buf[start + 1:end]
+        end = start
+        if b"item.completed" not in line:
+            continue
         try:
             event = json.loads(line)
-            if event.get("type") == "item.completed":
-                item = event.get("item", {})
-                if item.get("type") == "agent_message" and item.get("text"):
-                    return item["text"]
-        except json.JSONDecodeError:
+        except (json.JSONDecodeError, UnicodeDecodeError):
             continue
+        if isinstance(event, dict) and event.get("type") == "item.completed":
+            item = event.get("item", {})
+            if item.get("type") == "agent_message" and item.get("text"):
+                return item["text"]
     raise RuntimeError("codex 输出中未找到有效响应")
 
 
@@ -76,17 +85,19 @@ def _run_claude(prompt: str, model: str | None) -> str:
     return result.stdout.strip()
 
 
+# ```lang ... ``` 整体包裹；第二行若单独是 markdown/md/空行也一并去掉
+_FENCE_UNWRAP = re.compile(
+    r"\A```[^\n]*(?:\n[^\S\n]*(?i:markdown|md)?[^\S\n]*(?=\n))?(?:\n(.*))?\n[^\S\n]*```[^\S\n]*\Z",
+    re.DOTALL,
+)
+
+
 def clean_markdown(text: str) -> str:
     """清理 AI 输出，移除可能的代码块包裹"""
     text = text.strip()
-    # 移除 ```markdown ... ``` 包裹
-    if text.startswith("```"):
-        lines = text.split("\n")
-        if lines[-1].strip() == "```":
-            lines = lines[1:-1]
-            if lines and lines[0].strip().lower() in ("markdown", "md", ""):
-                lines = lines[1:]
-            text = "\n".join(lines)
+    m = _FENCE_UNWRAP.match(text)
+    if m:
+        text = m.group(1) or ""
     return text.strip()
 
 
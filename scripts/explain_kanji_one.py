@@ -2,83 +2,197 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import collections
+import hashlib
 import json
-import subprocess
+import os
 import sys
 import tempfile
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
 
-def _atomic_write_text(path: Path, content: str) -> None:
+DEFAULT_BATCH_SIZE = 8
+MAX_BATCH_SIZE = 16
+DEFAULT_CONCURRENCY = 4
+DEFAULT_CACHE_DIR = Path("data/.codex_cache")
+STDOUT_LINE_LIMIT = 16 * 1024 * 1024
+STDOUT_TAIL_LINES = 20
+
+
+def _atomic_write_bytes(path: Path, content: bytes) -> None:
+    # The temp file lives next to `path` (same filesystem, so the rename is atomic) and is
+    # created O_EXCL by mkstemp; file and directory are fsynced so a crash cannot leave an
+    # empty file behind the rename. Windows cannot open a directory for fsync, so skip it there.
     path.parent.mkdir(parents=True, exist_ok=True)
-    with tempfile.NamedTemporaryFile("w", encoding="utf-8", delete=False, dir=path.parent) as f:
+    with tempfile.NamedTemporaryFile(
+        "wb", delete=False, dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    ) as f:
         tmp = Path(f.name)
-        f.write(content)
-        f.flush()
-    tmp.replace(path)
+        try:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.close()
+            tmp.unlink(missing_ok=True)
+            raise
+    try:
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    if os.name != "nt":
+        fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
 
 
 def _load_json(path: Path) -> dict:
     if not path.exists():
         return {}
-    return json.loads(path.read_text(encoding="utf-8"))
+    return _loads_json(path.read_bytes())
 
 
-def _extract_last_agent_message(stdout: str) -> str:
-    last_message = None
-    for line in stdout.splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        try:
-            event = json.loads(line)
-        except json.JSONDecodeError:
-            continue
-        if event.get("type") != "item.completed":
-            continue
-        item = event.get("item") or {}
-        if item.get("type") != "agent_message":
-            continue
-        text = item.get("text")
-        if isinstance(text, str) and text:
-            last_message = text
-    if not last_message:
-        raise RuntimeError("No agent_message found in codex --json output.")
-    return last_message
+def _loads_json(raw: bytes):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
 
+def _dumps_json(obj, *, indent: bool = False) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=(orjson.OPT_INDENT_2 if indent else 0) | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
 
-def _parse_json_object(text: str) -> dict:
+
+def _journal_path(out_path: Path) -> Path:
+    return out_path.with_suffix(".jsonl")
+
+
+def _grade_bucket(data: dict, grade_key: str) -> dict:
+    grade_bucket = data.setdefault(grade_key, {})
+    if not isinstance(grade_bucket, dict):
+        raise SystemExit(f"Invalid output JSON: expected object at grade '{grade_key}'.")
+    return grade_bucket
+
+
+def _replay_journal(data: dict, journal_path: Path) -> int:
+    """Apply {"grade","kanji","explanation"} rows left by an earlier run; return the row count."""
+    if not journal_path.exists():
+        return 0
+    count = 0
+    with journal_path.open("rb") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+                grade_key, kanji, explanation = str(row["grade"]), row["kanji"], row["explanation"]
+            except (ValueError, TypeError, KeyError):
+                continue  # e.g. a half-written last line after a crash
+            _grade_bucket(data, grade_key)[kanji] = explanation
+            count += 1
+    return count
+
+
+def _compact(data: dict, out_path: Path, journal_path: Path) -> None:
+    _atomic_write_bytes(out_path, _dumps_json(data, indent=True) + b"\n")
+    journal_path.unlink(missing_ok=True)
+
+
+def _agent_message_from_event(line: bytes) -> str | None:
+    if b'"item.completed"' not in line:
+        return None
+    try:
+        event = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    if not isinstance(event, dict) or event.get("type") != "item.completed":
+        return None
+    item = event.get("item") or {}
+    if item.get("type") != "agent_message":
+        return None
+    text = item.get("text")
+    return text if isinstance(text, str) and text else None
+
+
+def _parse_json_array(text: str) -> list:
     try:
         obj = json.loads(text)
     except json.JSONDecodeError:
-        start = text.find("{")
-        end = text.rfind("}")
+        start = text.find("[")
+        end = text.rfind("]")
         if start == -1 or end == -1 or end <= start:
             raise
         obj = json.loads(text[start : end + 1])
-    if not isinstance(obj, dict):
-        raise RuntimeError("Agent output is not a JSON object.")
+    if not isinstance(obj, list):
+        raise RuntimeError("Agent output is not a JSON array.")
     return obj
 
 
-def _build_prompt(kanji: str, grade: int) -> str:
+def _build_prompt_batch(items: list[tuple[str, int]]) -> str:
+    inputs = json.dumps([{"kanji": k, "grade": g} for k, g in items], ensure_ascii=False)
     return (
-        "你是一名日语汉字老师，请面向中文母语学习者，详细解释下面这个“单个汉字”。\n"
+        "你是一名日语汉字老师，请面向中文母语学习者，逐个详细解释下面列出的每一个“单个汉字”。\n"
         "\n"
         "输出要求：\n"
-        "- 只输出一个 JSON 对象，不要输出任何多余文字/markdown/代码块。\n"
+        "- 只输出一个 JSON 数组，不要输出任何多余文字/markdown/代码块。\n"
         "- JSON 必须能被 json.loads 直接解析。\n"
-        "- JSON 结构固定为：\n"
+        "- 数组元素与输入一一对应、顺序相同，每个元素结构固定为：\n"
         '  {"kanji":"<原样汉字>","grade":<1-6整数>,"explanation":"<string>"}\n'
         "- explanation 请包含：核心含义（中文）、音读/训读、常见词汇例子（>=5个，带假名读音）、"
         "部首、笔画数、易混字对比、记忆/书写要点。\n"
         "- 为了保证 JSON 有效：explanation 里不要出现未转义的换行符；如需换行，请用 \\n 两个字符表示。\n"
         "\n"
-        f"输入：kanji={kanji} grade={grade}\n"
+        f"输入（共 {len(items)} 个）：{inputs}\n"
     )
 
 
-def run_codex(prompt: str, *, model: str | None, sandbox: str) -> dict:
+RESULT_FIELDS = ("kanji", "grade", "explanation")
+
+
+def _validate_batch(items: list[tuple[str, int]], results: list) -> dict[str, str]:
+    """Check each result against {"kanji": <input kanji>, "grade": <input grade>, "explanation": <non-empty str>}."""
+    if len(results) != len(items):
+        raise RuntimeError(f"Agent returned {len(results)} results for {len(items)} kanji.")
+    explanations: dict[str, str] = {}
+    for (kanji, grade), result in zip(items, results):
+        if not isinstance(result, dict):
+            raise RuntimeError(f"Agent returned a non-object result for {kanji!r}.")
+        missing = [field for field in RESULT_FIELDS if field not in result]
+        if missing:
+            raise RuntimeError(f"Agent result for {kanji!r} is missing {', '.join(missing)}.")
+        if result["kanji"] != kanji:
+            raise RuntimeError(f"Agent returned mismatched kanji: {result['kanji']!r} != {kanji!r}")
+        # Accept 3 or "3", but not 3.5 / True, which int() would silently coerce
+        result_grade = result["grade"]
+        grade_ok = isinstance(result_grade, (int, str)) and not isinstance(result_grade, bool)
+        if not grade_ok or str(result_grade).strip() != str(grade):
+            raise RuntimeError(f"Agent returned mismatched grade: {result_grade!r} != {grade!r}")
+        explanation = result["explanation"]
+        if not isinstance(explanation, str) or not explanation.strip():
+            raise RuntimeError(f"Agent returned empty or non-string explanation for {kanji!r}.")
+        explanations[kanji] = explanation
+    return explanations
+
+
+def _cache_path(cache_dir: Path, prompt: str, *, model: str | None, sandbox: str) -> Path:
+    key = hashlib.sha256("\0".join((model or "", sandbox, prompt)).encode("utf-8")).hexdigest()
+    return cache_dir / key[:2] / f"{key}.json"
+
+
+def _read_cache(path: Path) -> list | None:
+    try:
+        obj = _loads_json(path.read_bytes())
+    except (OSError, ValueError):
+        return None
+    return obj if isinstance(obj, list) else None
+
+
+async def run_codex(prompt: str, *, model: str | None, sandbox: str) -> list:
     cmd = ["codex"]
     if model:
         cmd += ["-m", model]
@@ -93,24 +207,104 @@ def run_codex(prompt: str, *, model: str | None, sandbox: str) -> dict:
         prompt,
     ]
 
-    completed = subprocess.run(cmd, capture_output=True, text=True)
-    if completed.returncode != 0:
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        limit=STDOUT_LINE_LIMIT,
+    )
+
+    # Parse events as they arrive: only the latest agent_message and a short tail are kept.
+    last_message = None
+    tail: collections.deque[bytes] = collections.deque(maxlen=STDOUT_TAIL_LINES)
+
+    async def read_stdout() -> None:
+        nonlocal last_message
+        async for line in proc.stdout:
+            tail.append(line)
+            message = _agent_message_from_event(line)
+            if message is not None:
+                last_message = message
+
+    try:
+        _, stderr_b = await asyncio.gather(read_stdout(), proc.stderr.read())
+        await proc.wait()
+    finally:
+        # A read error (e.g. a line over STDOUT_LINE_LIMIT) or cancellation must not orphan codex.
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+    if proc.returncode != 0:
+        stdout_tail = b"".join(tail).decode("utf-8", errors="replace")
         raise RuntimeError(
             "codex exec failed\n"
             f"cmd: {' '.join(cmd)}\n"
-            f"stdout:\n{completed.stdout}\n"
-            f"stderr:\n{completed.stderr}\n"
+            f"stdout (last {STDOUT_TAIL_LINES} lines):\n{stdout_tail}\n"
+            f"stderr:\n{stderr_b.decode('utf-8', errors='replace')}\n"
         )
 
-    last_message = _extract_last_agent_message(completed.stdout)
-    return _parse_json_object(last_message)
+    if not last_message:
+        raise RuntimeError("No agent_message found in codex --json output.")
+    return _parse_json_array(last_message)
+
+
+async def _explain_batches(
+    batches: list[list[tuple[str, int]]],
+    *,
+    model: str | None,
+    sandbox: str,
+    concurrency: int,
+    cache_dir: Path | None,
+    on_batch_done,
+) -> int:
+    """Run codex for all batches with at most `concurrency` calls in flight; return the failure count.
+
+    With `cache_dir`, validated results are stored under sha256(model, sandbox, prompt), so a
+    batch whose prompt has not changed is answered from disk without launching codex.
+    """
+    sem = asyncio.Semaphore(concurrency)
+
+    async def explain(items: list[tuple[str, int]]) -> tuple[list[tuple[str, int]], dict[str, str] | Exception]:
+        prompt = _build_prompt_batch(items)
+        cache_path = _cache_path(cache_dir, prompt, model=model, sandbox=sandbox) if cache_dir else None
+        if cache_path is not None:
+            cached = _read_cache(cache_path)
+            if cached is not None:
+                try:
+                    return items, _validate_batch(items, cached)
+                except RuntimeError:
+                    pass
+        async with sem:
+            try:
+                results = await run_codex(prompt, model=model, sandbox=sandbox)
+                explanations = _validate_batch(items, results)
+            except (RuntimeError, ValueError) as e:
+                return items, e
+        if cache_path is not None:
+            _atomic_write_bytes(cache_path, _dumps_json(results) + b"\n")
+        return items, explanations
+
+    failures = 0
+    for fut in asyncio.as_completed([explain(items) for items in batches]):
+        items, outcome = await fut
+        if isinstance(outcome, Exception):
+            failures += 1
+            kanji = "".join(k for k, _ in items)
+            print(f"Failed: kanji={kanji}: {outcome}", file=sys.stderr)
+            continue
+        on_batch_done(outcome)
+    return failures
 
 
 def main(argv: list[str]) -> int:
     parser = argparse.ArgumentParser(
-        description="Test: launch Codex for a single kanji and save {grade: {kanji: explanation}} JSON."
+        description="Test: launch Codex for one or more kanji and save {grade: {kanji: explanation}} JSON."
     )
-    parser.add_argument("kanji", help="Single kanji character, e.g. 日")
+    parser.add_argument("kanji", nargs="*", help="One or more single kanji characters, e.g. 日 月 火")
     parser.add_argument("--grade", type=int, default=1, help="Grade (1-6). Default: 1")
     parser.add_argument(
         "--out",
@@ -122,6 +316,24 @@ def main(argv: list[str]) -> int:
         action="store_true",
         help="If output already contains this (grade, kanji), skip.",
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Kanji per codex call, 1..{MAX_BATCH_SIZE} (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="Max codex calls in flight (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=str(DEFAULT_CACHE_DIR),
+        help="Directory for cached codex results keyed by prompt hash (default: %(default)s).",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the codex result cache.")
     parser.add_argument("--model", help="Optional model override for `codex -m`.")
     parser.add_argument(
         "--sandbox",
@@ -129,45 +341,84 @@ def main(argv: list[str]) -> int:
         choices=("read-only", "workspace-write", "danger-full-access"),
         help="Codex sandbox mode (default: %(default)s).",
     )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Only fold the <out>.jsonl journal left by an interrupted run into the output JSON.",
+    )
     args = parser.parse_args(argv)
 
-    kanji = args.kanji.strip()
-    if len(kanji) != 1:
-        raise SystemExit("`kanji` must be exactly 1 character.")
-    if not (1 <= args.grade <= 6):
-        raise SystemExit("`--grade` must be in 1..6.")
-
     out_path = Path(args.out)
+    journal_path = _journal_path(out_path)
     data = _load_json(out_path)
+    replayed = _replay_journal(data, journal_path)
+
+    if args.compact:
+        if replayed or journal_path.exists():
+            _compact(data, out_path, journal_path)
+        print(f"Compacted {replayed} journal rows into {out_path}", file=sys.stderr)
+        return 0
+    if not args.kanji:
+        parser.error("at least one kanji is required unless --compact is given")
+
+    kanji_list = [k.strip() for k in args.kanji]
+    if any(len(k) != 1 for k in kanji_list):
+        raise SystemExit("Each `kanji` must be exactly 1 character.")
+    kanji_list = list(dict.fromkeys(kanji_list))
+    if not (1 <= args.grade <= 6):
+        raise SystemExit("`--grade` must be in 1..6.")
+    if not (1 <= args.batch_size <= MAX_BATCH_SIZE):
+        raise SystemExit(f"`--batch-size` must be in 1..{MAX_BATCH_SIZE}.")
+    if args.concurrency < 1:
+        raise SystemExit("`--concurrency` must be >= 1.")
 
     grade_key = str(args.grade)
-    grade_bucket = data.get(grade_key)
-    if grade_bucket is None:
-        grade_bucket = {}
-        data[grade_key] = grade_bucket
-    if not isinstance(grade_bucket, dict):
-        raise SystemExit(f"Invalid output JSON: expected object at grade '{grade_key}'.")
+    grade_bucket = _grade_bucket(data, grade_key)
 
-    if args.resume and kanji in grade_bucket:
-        print(f"Skip (already exists): grade={args.grade} kanji={kanji}", file=sys.stderr)
-        return 0
+    if args.resume:
+        for kanji in kanji_list:
+            if kanji in grade_bucket:
+                print(f"Skip (already exists): grade={args.grade} kanji={kanji}", file=sys.stderr)
+        kanji_list = [k for k in kanji_list if k not in grade_bucket]
 
-    prompt = _build_prompt(kanji, args.grade)
-    result = run_codex(prompt, model=args.model, sandbox=args.sandbox)
+    batches = [
+        [(kanji, args.grade) for kanji in kanji_list[i : i + args.batch_size]]
+        for i in range(0, len(kanji_list), args.batch_size)
+    ]
 
-    if result.get("kanji") != kanji:
-        raise SystemExit(f"Agent returned mismatched kanji: {result.get('kanji')!r} != {kanji!r}")
-    if int(result.get("grade")) != args.grade:
-        raise SystemExit(f"Agent returned mismatched grade: {result.get('grade')!r} != {args.grade!r}")
+    # Each finished batch is appended to the journal (O_APPEND, one write per batch);
+    # the pretty output JSON is rewritten only once, at the end.
+    journal_path.parent.mkdir(parents=True, exist_ok=True)
+    journal = journal_path.open("ab", buffering=0)
 
-    explanation = result.get("explanation")
-    if not isinstance(explanation, str) or not explanation.strip():
-        raise SystemExit("Agent returned empty or non-string explanation.")
+    def save_batch(explanations: dict[str, str]) -> None:
+        grade_bucket.update(explanations)
+        rows = "".join(
+            json.dumps({"grade": args.grade, "kanji": k, "explanation": v}, ensure_ascii=False) + "\n"
+            for k, v in explanations.items()
+        )
+        journal.write(rows.encode("utf-8"))
+        print(f"Saved: grade={args.grade} kanji={''.join(explanations)}", file=sys.stderr)
 
-    grade_bucket[kanji] = explanation
-    _atomic_write_text(out_path, json.dumps(data, ensure_ascii=False, indent=2) + "\n")
-    print(f"Wrote: {out_path} (grade={args.grade} kanji={kanji})", file=sys.stderr)
-    return 0
+    try:
+        failures = asyncio.run(
+            _explain_batches(
+                batches,
+                model=args.model,
+                sandbox=args.sandbox,
+                concurrency=args.concurrency,
+                cache_dir=None if args.no_cache else Path(args.cache_dir),
+                on_batch_done=save_batch,
+            )
+        )
+    finally:
+        journal.close()
+        if replayed or journal_path.stat().st_size:
+            _compact(data, out_path, journal_path)
+            print(f"Wrote: {out_path}", file=sys.stderr)
+        else:
+            journal_path.unlink(missing_ok=True)
+    return 1 if failures else 0
 
 
 if __name__ == "__main__":
@@ -2,14 +2,21 @@
 """生成按年级/常用补充分组的EPUB - 支持锚点跳转"""
 import argparse
 import json
+import mmap
 from pathlib import Path
-import markdown
 from ebooklib import epub
 
-from render_kanji import render
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+from render_kanji import render_html
 
 DATA_DIR = Path(__file__).parent.parent / "data"
 DB_FILE = DATA_DIR / "kanji_db_v2.json"
+# DEFLATE 压缩级别：3 比 ebooklib 默认的 6 快一倍多，EPUB 只大一成左右
+ZIP_COMPRESSLEVEL = 3
 
 CSS = '''
 body { font-family: -apple-system, "PingFang SC", "Hiragino Sans", sans-serif; line-height: 1.9; color: #333; padding: 1em; }
@@ -33,25 +40,21 @@ rt { font-size: 0.52em; color: #64748b; font-weight: 500; }
 '''
 
 
+def _completed_by_grade(db: dict) -> dict[int, list[tuple[str, dict]]]:
+    """一遍扫描把已完成的汉字按年级分桶；桶内保持数据库顺序，年级按 1-6、常用补充排序"""
+    buckets: dict[int, list[tuple[str, dict]]] = {}
+    for kanji, entry in db["kanji"].items():
+        if entry.get("status") == "completed":
+            buckets.setdefault(int(entry.get("grade", 7)), []).append((kanji, entry))
+    return {grade: buckets[grade] for grade in sorted(buckets, key=lambda grade: (grade > 6, grade))}
+
+
 def _grade_kanji_in_db_order(db: dict, grade: int) -> list[tuple[str, dict]]:
-    return [
-        (kanji, entry)
-        for kanji, entry in db["kanji"].items()
-        if entry["grade"] == grade and entry["status"] == "completed"
-    ]
+    return _completed_by_grade(db).get(grade, [])
 
 
 def _grades_in_db_order(db: dict) -> list[int]:
-    grades: list[int] = []
-    seen: set[int] = set()
-    for entry in db["kanji"].values():
-        if entry.get("status") != "completed":
-            continue
-        grade = int(entry.get("grade", 7))
-        if grade not in seen:
-            seen.add(grade)
-            grades.append(grade)
-    return sorted(grades, key=lambda grade: (grade > 6, grade))
+    return list(_completed_by_grade(db))
 
 
 def _grade_title(grade: int) -> str:
@@ -62,8 +65,17 @@ def _grade_title(grade: int) -> str:
     return f"分组{grade}"
 
 
-def create_epub(db_path: Path, output: Path):
-    db = json.loads(db_path.read_text(encoding="utf-8"))
+def _load_db(db_path: Path) -> dict:
+    """读数据库；有 orjson 时直接解析 mmap，省掉整份文件的 bytes/str 副本"""
+    if orjson is None:
+        return json.loads(db_path.read_bytes())
+    with open(db_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            return orjson.loads(view)
+
+
+def create_epub(db_path: Path, output: Path, compresslevel: int = ZIP_COMPRESSLEVEL):
+    db = _load_db(db_path)
 
     book = epub.EpubBook()
     book.set_identifier('kyoiku-kanji-guide')
@@ -74,15 +86,11 @@ def create_epub(db_path: Path, output: Path):
     style = epub.EpubItem(uid="style", file_name="style.css", media_type="text/css", content=CSS)
     book.add_item(style)
 
-    md = markdown.Markdown(extensions=['tables', 'fenced_code'])
     chapters = []
     toc = []
 
     # 按年级/常用补充分组
-    for grade in _grades_in_db_order(db):
-        grade_kanji = _grade_kanji_in_db_order(db, grade)
-        if not grade_kanji:
-            continue
+    for grade, grade_kanji in _completed_by_grade(db).items():
         grade_title = _grade_title(grade)
 
         # 每年级一个xhtml，每个汉字用section+id做锚点
@@ -90,15 +98,15 @@ def create_epub(db_path: Path, output: Path):
         nav_items = []
 
         for kanji, entry in grade_kanji:
-            # 从结构化数据渲染 Markdown，再转 HTML
-            md_content = render(kanji, entry["data"])
-            html_body = md.convert(md_content)
-            md.reset()
+            # 结构化数据直接渲染成 HTML，不经过 Markdown
+            html_body = render_html(kanji, entry["data"])
             html_parts.append(f'<section id="{kanji}">\n{html_body}\n</section>')
             nav_items.append(epub.Link(f"grade{grade}.xhtml#{kanji}", kanji, f"kanji-{kanji}"))
 
         ch = epub.EpubHtml(title=grade_title, file_name=f"grade{grade}.xhtml", lang="ja")
-        ch.set_content(f'<html><head><link rel="stylesheet" href="style.css"/></head><body>{"".join(html_parts)}</body></html>')
+        # ebooklib 会丢掉内容里的 <head>，自己按 add_item 生成 <link>，所以只传 body；
+        # add_item 只写这一章的 link，不会在 manifest 里重复登记 style.css
+        ch.set_content(f'<html><body>{"".join(html_parts)}</body></html>')
         ch.add_item(style)
         book.add_item(ch)
         chapters.append(ch)
@@ -111,12 +119,18 @@ def create_epub(db_path: Path, output: Path):
     book.add_item(epub.EpubNav())
     book.spine = ['nav'] + chapters
 
-    epub.write_epub(str(output), book, {})
+    # 内容里没有 epub:type="pagebreak" 页码标记，关掉 page-list，
+    # 否则 ebooklib 每次构建都要把所有章节用 lxml 重新解析一遍去找页码
+    epub.write_epub(str(output), book, {"epub3_pages": False, "compresslevel": compresslevel})
     print(f"已生成: {output}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("--db", type=Path, default=DB_FILE, help="Input kanji DB JSON")
     parser.add_argument("--output", type=Path, default=DATA_DIR / "教育汉字详解.epub")
+    parser.add_argument(
+        "--compresslevel", type=int, default=ZIP_COMPRESSLEVEL, choices=range(0, 10), metavar="0-9",
+        help="zip DEFLATE 压缩级别（默认 %(default)s）",
+    )
     args = parser.parse_args()
-    create_epub(args.db, args.output)
+    create_epub(args.db, args.output, args.compresslevel)
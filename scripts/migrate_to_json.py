@@ -1,44 +1,62 @@
 #!/usr/bin/env python3
 """迁移现有MD文件到JSON数据库"""
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 DATA_DIR = Path(__file__).parent.parent / "data"
 MD_DIR = DATA_DIR / "kanji_explanations"
 GRADE_FILE = DATA_DIR / "kyoiku_kanji_2020_by_grade.json"
 DB_FILE = DATA_DIR / "kanji_db.json"
+READ_WORKERS = 16
+
+
+def _scan_md_files(md_dir: Path) -> list[os.DirEntry]:
+    """一次 scandir 拿到目录下的 *.md 文件（和 glob 一样跳过隐藏文件）"""
+    if not md_dir.is_dir():
+        return []
+    with os.scandir(md_dir) as it:
+        return [e for e in it if e.name.endswith(".md") and not e.name.startswith(".") and e.is_file()]
+
+
+def _read_text(entry: os.DirEntry) -> str:
+    with open(entry.path, encoding="utf-8") as f:
+        return f.read()
 
 def main():
     # 加载年级数据
-    grade_data = json.loads(GRADE_FILE.read_text(encoding="utf-8"))
-
-    # 构建汉字->年级映射
-    kanji_to_grade = {}
-    for grade, kanji_list in grade_data["by_grade"].items():
-        for k in kanji_list:
-            kanji_to_grade[k] = int(grade)
-
-    # 读取现有MD文件
-    kanji_db = {"meta": {"total": grade_data["total"], "completed": 0, "last_updated": datetime.now().isoformat()}, "kanji": {}}
-
-    for md_file in MD_DIR.glob("*.md"):
-        kanji = md_file.stem
-        if kanji in kanji_to_grade:
-            content = md_file.read_text(encoding="utf-8")
-            kanji_db["kanji"][kanji] = {
-                "grade": kanji_to_grade[kanji],
-                "status": "completed",
-                "content": content
-            }
-            kanji_db["meta"]["completed"] += 1
-
-    # 添加未完成的汉字
-    for kanji, grade in kanji_to_grade.items():
-        if kanji not in kanji_db["kanji"]:
-            kanji_db["kanji"][kanji] = {"grade": grade, "status": "pending", "content": None}
-
-    DB_FILE.write_text(json.dumps(kanji_db, ensure_ascii=False, indent=2), encoding="utf-8")
+    raw = GRADE_FILE.read_bytes()
+    grade_data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+    # 先按年级表一次建好全部条目（默认 pending），再用 MD 文件覆盖成 completed
+    kanji_db = {
+        "meta": {"total": grade_data["total"], "completed": 0, "last_updated": datetime.now().isoformat()},
+        "kanji": {
+            k: {"grade": int(grade), "status": "pending", "content": None}
+            for grade, kanji_list in grade_data["by_grade"].items()
+            for k in kanji_list
+        },
+    }
+    entries = kanji_db["kanji"]
+
+    # 只读对得上年级表的文件；小文件多、瓶颈在 IO，用线程池并发读
+    md_entries = [e for e in _scan_md_files(MD_DIR) if e.name[:-3] in entries]
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as pool:
+        for md_entry, content in zip(md_entries, pool.map(_read_text, md_entries)):
+            entries[md_entry.name[:-3]].update(status="completed", content=content)
+    kanji_db["meta"]["completed"] = len(md_entries)
+
+    if orjson is not None:
+        DB_FILE.write_bytes(orjson.dumps(kanji_db, option=orjson.OPT_INDENT_2))
+    else:
+        DB_FILE.write_text(json.dumps(kanji_db, ensure_ascii=False, indent=2), encoding="utf-8")
     print(f"已创建: {DB_FILE}")
     print(f"完成: {kanji_db['meta']['completed']}/{kanji_db['meta']['total']}")
 
@@ -1,4 +1,4 @@
-"""Render kanji explanation JSON as Markdown."""
+"""Render kanji explanation JSON as Markdown, or straight to HTML for the EPUB."""
 
 from __future__ import annotations
 
@@ -6,6 +6,10 @@ import html
 import re
 
 
+INLINE_CODE_RE = re.compile(r"`([^`\n\x1e\x1f]+)`")
+# Table cells/rows are joined with these before escaping, so a whole table is escaped in one call
+CELL_SEP = "\x1f"
+ROW_SEP = "\x1e"
 KANJI_RUBY_RE = re.compile(r"([一-龯々〆ヵヶ]+)\[([ぁ-ゖァ-ヺー]+)\]")
 NUMBERED_PINYIN_RE = re.compile(r"([A-Za-züÜvV:]+)([1-5])")
 PINYIN_TONES = {
@@ -22,6 +26,16 @@ def _escape(text: object) -> str:
     return html.escape(str(text or ""), quote=False)
 
 
+def _inline_html(text: object) -> str:
+    """Escape a data string for HTML, keeping the `code` spans the model writes in it."""
+    value = str(text or "")
+    if "&" in value or "<" in value or ">" in value:
+        value = html.escape(value, quote=False)
+    if "`" in value:
+        value = INLINE_CODE_RE.sub(r"<code>\1</code>", value)
+    return value
+
+
 def _ruby_text_to_html(text: object) -> str:
     escaped = _escape(text)
     return KANJI_RUBY_RE.sub(r"<ruby>\1<rt>\2</rt></ruby>", escaped)
@@ -86,7 +100,7 @@ def _sentence_pronunciation(sentence: dict) -> str:
     ).strip()
 
 
-def _append_example_sentence(lines: list[str], reading: dict) -> None:
+def _append_example_sentence(lines: list[str], reading: dict, heading: str = "#### 例句与发音\n") -> None:
     sentence = reading.get("example_sentence") or reading.get("sentence")
     if not isinstance(sentence, dict):
         return
@@ -99,7 +113,7 @@ def _append_example_sentence(lines: list[str], reading: dict) -> None:
     if not (jp_ruby or kana or pronunciation or zh or note):
         return
 
-    lines.append("#### 例句与发音\n")
+    lines.append(heading)
     lines.append('<div class="reading-example">')
     if jp_ruby:
         lines.append(f'<div class="jp-example">{_ruby_text_to_html(jp_ruby)}</div>')
@@ -187,119 +201,120 @@ def _append_homophone_groups(lines: list[str], groups: list[dict], empty_text: s
 
 def _render_memory_schema(kanji: str, data: dict) -> str:
     lines = [f"# {kanji}\n"]
+    append = lines.append
 
-    lines.append("## 释义总览\n")
-    lines.append(f"{data.get('summary', '')}\n")
+    append("## 释义总览\n")
+    append(f"{data.get('summary', '')}\n")
 
     core = data.get("semantic_core") or {}
-    lines.append("## 核心义\n")
-    lines.append(f"**核心**：{core.get('core', '')}\n")
-    lines.append(f"**扩展**：{core.get('extension', '')}\n")
-    lines.append(f"**词根/来源提示**：{core.get('root_hint', '')}\n")
-
-    readings = data.get("readings", [])
-    lines.append("## 读音总览\n")
-    lines.append("| 读法 | 罗马字 | 类型 | 使用场景 |")
-    lines.append("|------|--------|------|----------|")
-    for reading in readings:
-        lines.append(
-            f"| {reading.get('kana', '')} | {reading.get('romaji', '')} | {reading.get('type', '')} | "
-            f"{reading.get('usage', '')} |"
-        )
+    append("## 核心义\n")
+    append(f"**核心**：{core.get('core', '')}\n")
+    append(f"**扩展**：{core.get('extension', '')}\n")
+    append(f"**词根/来源提示**：{core.get('root_hint', '')}\n")
+
+    # 读音总览和读音详解在同一遍循环里生成，详解先攒在 detail 里
+    append("## 读音总览\n")
+    append("| 读法 | 罗马字 | 类型 | 使用场景 |")
+    append("|------|--------|------|----------|")
+    detail = ["\n## 读音详解\n"]
+    detail_append = detail.append
+    for idx, reading in enumerate(data.get("readings", []), start=1):
+        kana = reading.get("kana", "")
+        romaji = reading.get("romaji", "")
+        reading_type = reading.get("type", "")
+        usage = reading.get("usage", "")
+        append(f"| {kana} | {romaji} | {reading_type} | {usage} |")
 
-    lines.append("\n## 读音详解\n")
-    for idx, reading in enumerate(readings, start=1):
         anchor = reading.get("anchor") or {}
-        lines.append(f"### 读法{idx}：{reading.get('kana', '')}（{reading.get('romaji', '')}）\n")
-        lines.append(f"**类型**：{reading.get('type', '')}\n")
-        lines.append(f"**使用场景**：{reading.get('usage', '')}\n")
-        lines.append(f"**来源提示**：{reading.get('origin_hint', '')}\n")
-        lines.append(
-            f"**锚点词**：{anchor.get('word', '')}（{anchor.get('reading', '')}）= "
-            f"{anchor.get('meaning', '')}；{anchor.get('hint', '')}\n"
-        )
-        _append_example_sentence(lines, reading)
-        lines.append("| 词汇 | 读音 | 含义 | 记忆关联 |")
-        lines.append("|------|------|------|----------|")
-        lines.append(
-            f"| {anchor.get('word', '')} | {anchor.get('reading', '')} | {anchor.get('meaning', '')} | 锚点词 |"
+        anchor_word = anchor.get("word", "")
+        anchor_reading = anchor.get("reading", "")
+        anchor_meaning = anchor.get("meaning", "")
+        detail_append(f"### 读法{idx}：{kana}（{romaji}）\n")
+        detail_append(f"**类型**：{reading_type}\n")
+        detail_append(f"**使用场景**：{usage}\n")
+        detail_append(f"**来源提示**：{reading.get('origin_hint', '')}\n")
+        detail_append(
+            f"**锚点词**：{anchor_word}（{anchor_reading}）= {anchor_meaning}；{anchor.get('hint', '')}\n"
         )
+        _append_example_sentence(detail, reading)
+        detail_append("| 词汇 | 读音 | 含义 | 记忆关联 |")
+        detail_append("|------|------|------|----------|")
+        detail_append(f"| {anchor_word} | {anchor_reading} | {anchor_meaning} | 锚点词 |")
         for example in reading.get("examples", []):
-            lines.append(
+            detail_append(
                 f"| {example.get('word', '')} | {example.get('reading', '')} | {example.get('meaning', '')} | "
                 f"{example.get('link', '')} |"
             )
         takeaway = str(reading.get("takeaway") or "")
         if takeaway:
-            lines.append(f"\n**读音记忆**：{takeaway}\n")
+            detail_append(f"\n**读音记忆**：{takeaway}\n")
+    lines += detail
 
-    lines.append("## 场景对照组\n")
+    append("## 场景对照组\n")
     _append_group_table(lines, data.get("scenario_contrast_groups", []), "（没有特别高价值的场景对照组）")
 
-    lines.append("## 同假名异义组\n")
+    append("## 同假名异义组\n")
     _append_homophone_groups(lines, data.get("homophone_groups", []), "（没有特别高价值的同假名异义组）")
 
-    lines.append("## 近义分工组\n")
+    append("## 近义分工组\n")
     _append_group_table(lines, data.get("near_synonym_groups", []), "（没有特别高价值的近义分工组）")
 
-    lines.append("## 同字扩展组\n")
+    append("## 同字扩展组\n")
     _append_group_table(lines, data.get("same_kanji_expansion_groups", []), "（没有特别高价值的同字扩展组）")
 
     pitfalls = data.get("pitfalls") or []
-    lines.append("## 易混点\n")
+    append("## 易混点\n")
     if pitfalls:
-        for item in pitfalls:
-            lines.append(f"- {item}")
-        lines.append("")
+        lines += [f"- {item}" for item in pitfalls]
+        append("")
     else:
-        lines.append("（暂无）\n")
+        append("（暂无）\n")
 
-    lines.append(f"## 总结记忆\n\n> {data.get('memory_chain', '')}")
+    append(f"## 总结记忆\n\n> {data.get('memory_chain', '')}")
     return "\n".join(lines)
 
 
 def _render_legacy_schema(kanji: str, data: dict) -> str:
     lines = [f"# {kanji}\n"]
-
-    lines.append("## 读音总览\n")
-    lines.append("| 读法 | 假名 | 罗马字 | 类型 |")
-    lines.append("|------|------|--------|------|")
-    for reading in data["readings"]:
-        lines.append(
-            f"| {reading.get('kana', '')} | {reading.get('kana', '')} | {reading.get('romaji', '')} | "
-            f"{reading.get('type', '')} |"
-        )
-
-    lines.append(f"\n## 释义\n\n{data.get('summary', '')}\n")
-    lines.append("## 读音详解\n")
-
+    append = lines.append
+
+    # 同 _render_memory_schema：一遍循环同时生成总览表和详解
+    append("## 读音总览\n")
+    append("| 读法 | 假名 | 罗马字 | 类型 |")
+    append("|------|------|--------|------|")
+    detail = [f"\n## 释义\n\n{data.get('summary', '')}\n", "## 读音详解\n"]
+    detail_append = detail.append
     for idx, reading in enumerate(data["readings"], start=1):
-        lines.append(f"### 读法{idx}：{reading.get('kana', '')}（{reading.get('romaji', '')}）\n")
-        lines.append(f"**类型**：{reading.get('type', '')}\n")
-        lines.append(f"**来源**：{reading.get('origin', '')}\n")
-        lines.append(f"**使用场景**：{reading.get('usage', '')}\n")
+        kana = reading.get("kana", "")
+        romaji = reading.get("romaji", "")
+        reading_type = reading.get("type", "")
+        append(f"| {kana} | {kana} | {romaji} | {reading_type} |")
 
         anchor = reading.get("anchor") or {}
-        lines.append("**核心词汇记忆**：")
-        lines.append(
-            f"记住「{anchor.get('word', '')}（{anchor.get('reading', '')}）」= {anchor.get('meaning', '')}，"
-            f"{anchor.get('hint', '')}\n"
-        )
-
-        lines.append("| 词汇 | 读音 | 含义 | 记忆关联 |")
-        lines.append("|------|------|------|----------|")
-        lines.append(
-            f"| {anchor.get('word', '')} | {anchor.get('reading', '')} | {anchor.get('meaning', '')} | 锚点词 |"
+        anchor_word = anchor.get("word", "")
+        anchor_reading = anchor.get("reading", "")
+        anchor_meaning = anchor.get("meaning", "")
+        detail_append(f"### 读法{idx}：{kana}（{romaji}）\n")
+        detail_append(f"**类型**：{reading_type}\n")
+        detail_append(f"**来源**：{reading.get('origin', '')}\n")
+        detail_append(f"**使用场景**：{reading.get('usage', '')}\n")
+        detail_append("**核心词汇记忆**：")
+        detail_append(
+            f"记住「{anchor_word}（{anchor_reading}）」= {anchor_meaning}，{anchor.get('hint', '')}\n"
         )
+        detail_append("| 词汇 | 读音 | 含义 | 记忆关联 |")
+        detail_append("|------|------|------|----------|")
+        detail_append(f"| {anchor_word} | {anchor_reading} | {anchor_meaning} | 锚点词 |")
         for example in reading.get("examples", []):
-            lines.append(
+            detail_append(
                 f"| {example.get('word', '')} | {example.get('reading', '')} | {example.get('meaning', '')} | "
                 f"{example.get('link', '')} |"
             )
-        lines.append("")
+        detail_append("")
+    lines += detail
 
-    lines.append(f"## 文化背景\n\n{data.get('culture', '')}\n")
-    lines.append(f"## 总结记忆\n\n> {data.get('memory_chain', '')}")
+    append(f"## 文化背景\n\n{data.get('culture', '')}\n")
+    append(f"## 总结记忆\n\n> {data.get('memory_chain', '')}")
     return "\n".join(lines)
 
 
@@ -308,3 +323,189 @@ def render(kanji: str, data: dict) -> str:
     if _is_memory_schema(data):
         return _render_memory_schema(kanji, data)
     return _render_legacy_schema(kanji, data)
+
+
+def _thead(*headers: str) -> str:
+    return "<table>\n<thead><tr>" + "".join(f"<th>{h}</th>" for h in headers) + "</tr></thead>\n"
+
+
+# Table headers are fixed per table kind, so their markup is built once at import
+READINGS_THEAD = _thead("读法", "罗马字", "类型", "使用场景")
+LEGACY_READINGS_THEAD = _thead("读法", "假名", "罗马字", "类型")
+EXAMPLES_THEAD = _thead("词汇", "读音", "含义", "记忆关联")
+GROUP_THEAD = _thead("词", "读音", "含义", "关系", "说明")
+HOMOPHONE_THEAD = _thead("词", "读音", "含义", "关系", "关键区别", "来源关系", "记忆钩子")
+
+
+def _html_table(parts: list[str], thead: str, rows: list[tuple]) -> None:
+    body = ""
+    if rows:
+        raw = ROW_SEP.join(CELL_SEP.join(str(cell or "") for cell in row) for row in rows)
+        cells = _inline_html(raw).replace(CELL_SEP, "</td><td>").replace(ROW_SEP, "</td></tr>\n<tr><td>")
+        body = f"<tr><td>{cells}</td></tr>\n"
+    parts.append(f"{thead}<tbody>\n{body}</tbody>\n</table>")
+
+
+def _html_labeled(parts: list[str], label: str, value: object) -> None:
+    parts.append(f"<p><strong>{label}</strong>：{_inline_html(value)}</p>")
+
+
+def _html_group_table(parts: list[str], groups: list[dict], empty_text: str) -> None:
+    if not groups:
+        parts.append(f"<p>{empty_text}</p>")
+        return
+
+    for idx, group in enumerate(groups, start=1):
+        parts.append(f"<h3>{_inline_html(group.get('title') or f'组 {idx}')}</h3>")
+        for key, label in (("why_it_works", "为什么这样记"), ("same_kana", "共同假名"), ("target_reading", "对应读音")):
+            value = group.get(key)
+            if value:
+                _html_labeled(parts, label, value)
+        _html_table(
+            parts,
+            GROUP_THEAD,
+            [
+                (item.get("word", ""), item.get("reading", ""), item.get("meaning", ""),
+                 item.get("relation", ""), item.get("note", ""))
+                for item in group.get("items", [])
+            ],
+        )
+        takeaway = group.get("takeaway")
+        if takeaway:
+            _html_labeled(parts, "记忆结论", takeaway)
+
+
+def _html_homophone_groups(parts: list[str], groups: list[dict], empty_text: str) -> None:
+    if not groups:
+        parts.append(f"<p>{empty_text}</p>")
+        return
+
+    for idx, group in enumerate(groups, start=1):
+        parts.append(f"<h3>{_inline_html(group.get('title') or f'组 {idx}')}</h3>")
+        for key, label in (
+            ("same_kana", "共同假名"),
+            ("origin_pattern", "同音类型"),
+            ("same_kana_reason", "为什么会同音"),
+            ("teaching_point", "教学重点"),
+            ("why_it_works", "为什么这样记"),
+        ):
+            value = group.get(key)
+            if value:
+                _html_labeled(parts, label, value)
+        _html_table(
+            parts,
+            HOMOPHONE_THEAD,
+            [
+                (item.get("word", ""), item.get("reading", ""), item.get("meaning", ""),
+                 item.get("relation", ""), item.get("note", ""), item.get("source_note", ""),
+                 item.get("memory_hook", ""))
+                for item in group.get("items", [])
+            ],
+        )
+        takeaway = group.get("takeaway")
+        if takeaway:
+            _html_labeled(parts, "记忆结论", takeaway)
+
+
+def _html_reading_examples(reading: dict, anchor: dict) -> list[tuple]:
+    rows = [(anchor.get("word", ""), anchor.get("reading", ""), anchor.get("meaning", ""), "锚点词")]
+    rows += [
+        (example.get("word", ""), example.get("reading", ""), example.get("meaning", ""), example.get("link", ""))
+        for example in reading.get("examples", [])
+    ]
+    return rows
+
+
+def _render_memory_schema_html(kanji: str, data: dict) -> str:
+    parts = [f"<h1>{_escape(kanji)}</h1>", "<h2>释义总览</h2>", f"<p>{_inline_html(data.get('summary', ''))}</p>"]
+    append = parts.append
+
+    core = data.get("semantic_core") or {}
+    append("<h2>核心义</h2>")
+    _html_labeled(parts, "核心", core.get("core", ""))
+    _html_labeled(parts, "扩展", core.get("extension", ""))
+    _html_labeled(parts, "词根/来源提示", core.get("root_hint", ""))
+
+    readings = data.get("readings", [])
+    append("<h2>读音总览</h2>")
+    _html_table(
+        parts,
+        READINGS_THEAD,
+        [(r.get("kana", ""), r.get("romaji", ""), r.get("type", ""), r.get("usage", "")) for r in readings],
+    )
+
+    append("<h2>读音详解</h2>")
+    for idx, reading in enumerate(readings, start=1):
+        anchor = reading.get("anchor") or {}
+        append(f"<h3>读法{idx}：{_escape(reading.get('kana', ''))}（{_escape(reading.get('romaji', ''))}）</h3>")
+        _html_labeled(parts, "类型", reading.get("type", ""))
+        _html_labeled(parts, "使用场景", reading.get("usage", ""))
+        _html_labeled(parts, "来源提示", reading.get("origin_hint", ""))
+        append(
+            f"<p><strong>锚点词</strong>：{_inline_html(anchor.get('word', ''))}（{_inline_html(anchor.get('reading', ''))}）= "
+            f"{_inline_html(anchor.get('meaning', ''))}；{_inline_html(anchor.get('hint', ''))}</p>"
+        )
+        _append_example_sentence(parts, reading, heading="<h4>例句与发音</h4>")
+        _html_table(parts, EXAMPLES_THEAD, _html_reading_examples(reading, anchor))
+        takeaway = reading.get("takeaway")
+        if takeaway:
+            _html_labeled(parts, "读音记忆", takeaway)
+
+    append("<h2>场景对照组</h2>")
+    _html_group_table(parts, data.get("scenario_contrast_groups", []), "（没有特别高价值的场景对照组）")
+
+    append("<h2>同假名异义组</h2>")
+    _html_homophone_groups(parts, data.get("homophone_groups", []), "（没有特别高价值的同假名异义组）")
+
+    append("<h2>近义分工组</h2>")
+    _html_group_table(parts, data.get("near_synonym_groups", []), "（没有特别高价值的近义分工组）")
+
+    append("<h2>同字扩展组</h2>")
+    _html_group_table(parts, data.get("same_kanji_expansion_groups", []), "（没有特别高价值的同字扩展组）")
+
+    pitfalls = data.get("pitfalls") or []
+    append("<h2>易混点</h2>")
+    if pitfalls:
+        append("<ul>\n" + "".join(f"<li>{_inline_html(item)}</li>\n" for item in pitfalls) + "</ul>")
+    else:
+        append("<p>（暂无）</p>")
+
+    append(f"<h2>总结记忆</h2>\n<blockquote><p>{_inline_html(data.get('memory_chain', ''))}</p></blockquote>")
+    return "\n".join(parts)
+
+
+def _render_legacy_schema_html(kanji: str, data: dict) -> str:
+    parts = [f"<h1>{_escape(kanji)}</h1>", "<h2>读音总览</h2>"]
+    append = parts.append
+    readings = data["readings"]
+    _html_table(
+        parts,
+        LEGACY_READINGS_THEAD,
+        [(r.get("kana", ""), r.get("kana", ""), r.get("romaji", ""), r.get("type", "")) for r in readings],
+    )
+
+    append(f"<h2>释义</h2>\n<p>{_inline_html(data.get('summary', ''))}</p>")
+    append("<h2>读音详解</h2>")
+    for idx, reading in enumerate(readings, start=1):
+        anchor = reading.get("anchor") or {}
+        append(f"<h3>读法{idx}：{_escape(reading.get('kana', ''))}（{_escape(reading.get('romaji', ''))}）</h3>")
+        _html_labeled(parts, "类型", reading.get("type", ""))
+        _html_labeled(parts, "来源", reading.get("origin", ""))
+        _html_labeled(parts, "使用场景", reading.get("usage", ""))
+        append(
+            f"<p><strong>核心词汇记忆</strong>：记住「{_inline_html(anchor.get('word', ''))}"
+            f"（{_inline_html(anchor.get('reading', ''))}）」= {_inline_html(anchor.get('meaning', ''))}，"
+            f"{_inline_html(anchor.get('hint', ''))}</p>"
+        )
+        _html_table(parts, EXAMPLES_THEAD, _html_reading_examples(reading, anchor))
+
+    append(f"<h2>文化背景</h2>\n<p>{_inline_html(data.get('culture', ''))}</p>")
+    append(f"<h2>总结记忆</h2>\n<blockquote><p>{_inline_html(data.get('memory_chain', ''))}</p></blockquote>")
+    return "\n".join(parts)
+
+
+def render_html(kanji: str, data: dict) -> str:
+    """Render structured data for one kanji as an HTML fragment with the same sections as `render`."""
+    if _is_memory_schema(data):
+        return _render_memory_schema_html(kanji, data)
+    return _render_legacy_schema_html(kanji, data)
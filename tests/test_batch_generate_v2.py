@@ -0,0 +1,71 @@
+from pathlib import Path
+import asyncio
+import sys
+import unittest
+from unittest import mock
+
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import batch_generate_v2 as batch_generate_v2  # noqa: E402
+
+
+class BatchGenerateV2SplitBatchOutputTest(unittest.TestCase):
+    def test_splits_each_kanji_section(self):
+        text = "---KANJI:一---\n# 一\n解释一\n---KANJI:二---\n# 二\n解释二\n"
+
+        self.assertEqual(
+            batch_generate_v2.split_batch_output(text, ["一", "二"]),
+            {"一": "# 一\n解释一", "二": "# 二\n解释二"},
+        )
+
+    def test_ignores_text_before_first_marker(self):
+        text = "好的，下面是解释：\n---KANJI:一---\n# 一\n"
+
+        self.assertEqual(batch_generate_v2.split_batch_output(text, ["一"]), {"一": "# 一"})
+
+    def test_missing_marker_leaves_kanji_out(self):
+        text = "---KANJI:一---\n# 一\n# 二 没有分隔符\n"
+
+        result = batch_generate_v2.split_batch_output(text, ["一", "二"])
+
+        self.assertEqual(list(result), ["一"])
+        self.assertIn("# 二 没有分隔符", result["一"])
+
+    def test_output_without_any_marker_yields_nothing(self):
+        self.assertEqual(batch_generate_v2.split_batch_output("# 一\n解释", ["一"]), {})
+
+    def test_duplicate_kanji_keeps_first_section(self):
+        text = "---KANJI:一---\n第一份\n---KANJI:一---\n第二份\n"
+
+        self.assertEqual(batch_generate_v2.split_batch_output(text, ["一"]), {"一": "第一份"})
+
+    def test_unexpected_kanji_is_ignored(self):
+        text = "---KANJI:三---\n# 三\n---KANJI:一---\n# 一\n"
+
+        self.assertEqual(batch_generate_v2.split_batch_output(text, ["一", "二"]), {"一": "# 一"})
+
+    def test_marker_must_be_on_its_own_line(self):
+        text = "---KANJI:一---\n正文里提到 ---KANJI:二--- 不算分隔符\n"
+
+        self.assertEqual(
+            batch_generate_v2.split_batch_output(text, ["一", "二"]),
+            {"一": "正文里提到 ---KANJI:二--- 不算分隔符"},
+        )
+
+    def test_strips_code_fences_and_drops_empty_sections(self):
+        text = "---KANJI:一---\n```markdown\n# 一\n```\n---KANJI:二---\n```\n```\n"
+
+        self.assertEqual(batch_generate_v2.split_batch_output(text, ["一", "二"]), {"一": "# 一"})
+
+    def test_run_claude_batch_returns_empty_content_for_missing_kanji(self):
+        output = "---KANJI:二---\n# 二\n"
+        with mock.patch.object(batch_generate_v2, "_call_claude", mock.AsyncMock(return_value=output)):
+            result = asyncio.run(batch_generate_v2.run_claude_batch(["一", "二"]))
+
+        self.assertEqual(result, [("一", ""), ("二", "# 二")])
+
+
+if __name__ == "__main__":
+    unittest.main()
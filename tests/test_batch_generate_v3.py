@@ -2,6 +2,7 @@ from pathlib import Path
 import json
 import os
 import sys
+import tempfile
 import unittest
 from unittest import mock
 
@@ -386,6 +387,27 @@ class BatchGenerateV3CodexConfigTest(unittest.TestCase):
             "à mě gǎ fǔ rī mā sù",
         )
 
+    def test_extract_codex_agent_message_skips_non_completion_events(self):
+        stream = "\n".join(
+            [
+                json.dumps({"type": "thread.started"}),
+                "not json",
+                json.dumps({"type": "item.completed", "item": {"type": "reasoning", "text": "思考"}}),
+                json.dumps({"type": "item.completed", "item": {"type": "agent_message", "text": "{}"}}),
+                json.dumps({"type": "item.delta", "text": "ignored"}),
+            ]
+        )
+
+        self.assertEqual(batch_generate_v3._extract_codex_agent_message(stream), "{}")
+        self.assertEqual(batch_generate_v3._extract_codex_agent_message(stream.encode()), "{}")
+
+    def test_escape_control_chars_only_inside_strings(self):
+        fix = batch_generate_v3._escape_unescaped_control_chars_in_strings
+
+        self.assertEqual(fix('{\n  "a": "x\ty",\n  "b": "q\\"\n"\n}'), '{\n  "a": "x\\ty",\n  "b": "q\\"\\n"\n}')
+        self.assertEqual(fix('{"a": "line\\\nnext"}'), '{"a": "line\\\nnext"}')
+        self.assertEqual(json.loads(fix('{"a": "一\n二"}')), {"a": "一\n二"})
+
     def test_build_initial_db_from_joyo_list_uses_kyoiku_grades_and_common_supplement_grade(self):
         db = batch_generate_v3._build_initial_db_from_kanji_list(
             ["一", "亜", "雨"],
@@ -424,5 +446,89 @@ class BatchGenerateV3QueueSelectionTest(unittest.TestCase):
         )
 
 
+class BatchGenerateV3JournalTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.journal_file = Path(tmp.name) / "kanji_db_v2.journal"
+        patcher = mock.patch.object(batch_generate_v3, "JOURNAL_FILE", self.journal_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.db = batch_generate_v3._build_initial_db_from_kanji_list(["一", "二", "三"], source="test")
+
+    def test_replay_journal_applies_results_and_skips_truncated_tail(self):
+        with self.journal_file.open("ab") as journal:
+            batch_generate_v3.append_journal(journal, "一", {"summary": "一"}, "")
+            batch_generate_v3.append_journal(journal, "二", None, "timeout_after=180s")
+            batch_generate_v3.append_journal(journal, "一", {"summary": "一 again"}, "")
+            journal.write('{"k": "三", "d"'.encode("utf-8"))
+
+        self.assertEqual(batch_generate_v3.replay_journal(self.db), 3)
+
+        self.assertEqual(self.db["meta"]["completed"], 1)
+        self.assertEqual(self.db["kanji"]["一"]["data"], {"summary": "一 again"})
+        self.assertEqual(self.db["kanji"]["二"]["status"], "failed")
+        self.assertEqual(self.db["kanji"]["二"]["error"], "timeout_after=180s")
+        self.assertEqual(self.db["kanji"]["三"]["status"], "pending")
+
+    def test_drop_journal_prefix_keeps_records_after_snapshot(self):
+        journal = self.journal_file.open("ab", buffering=0)
+        batch_generate_v3.append_journal(journal, "一", {"summary": "一"}, "")
+        snapshot_size = journal.tell()
+        batch_generate_v3.append_journal(journal, "二", {"summary": "二"}, "")
+        journal = batch_generate_v3.drop_journal_prefix(journal, snapshot_size)
+        with journal:
+            batch_generate_v3.append_journal(journal, "三", None, "boom")
+
+        self.assertFalse(self.journal_file.with_suffix(".journal.tmp").exists())
+        self.assertEqual(batch_generate_v3.replay_journal(self.db), 2)
+        self.assertEqual(self.db["kanji"]["一"]["status"], "pending")
+        self.assertEqual(self.db["kanji"]["二"]["status"], "completed")
+        self.assertEqual(self.db["kanji"]["三"]["status"], "failed")
+
+    def test_snapshot_has_kanji_matches_keys_without_loading_db(self):
+        db_file = self.journal_file.with_suffix(".json")
+        with mock.patch.object(batch_generate_v3, "DB_FILE", db_file):
+            self.assertIsNone(batch_generate_v3.snapshot_has_kanji("一"))
+
+            self.db["kanji"]["一"]["data"] = {"summary": "九", "note": "九 only appears inside values"}
+            db_file.write_text(json.dumps(self.db, ensure_ascii=False, indent=2), encoding="utf-8")
+            self.assertTrue(batch_generate_v3.snapshot_has_kanji("一"))
+            self.assertFalse(batch_generate_v3.snapshot_has_kanji("九"))
+
+    def test_persist_one_result_folds_journal_into_snapshot(self):
+        db_file = self.journal_file.with_suffix(".json")
+        db_file.write_bytes(batch_generate_v3._dumps_db(self.db))
+        with self.journal_file.open("ab") as journal:
+            batch_generate_v3.append_journal(journal, "二", {"summary": "二"}, "")
+
+        with mock.patch.object(batch_generate_v3, "DB_FILE", db_file):
+            self.assertTrue(batch_generate_v3.persist_one_result(None, "一", {"summary": "一"}, ""))
+
+        saved = json.loads(db_file.read_text(encoding="utf-8"))
+        self.assertEqual(saved["kanji"]["一"]["status"], "completed")
+        self.assertEqual(saved["kanji"]["二"]["status"], "completed")
+        self.assertEqual(saved["meta"]["completed"], 2)
+        self.assertEqual(self.journal_file.read_bytes(), b"")
+
+    def test_persist_one_result_keeps_completed_entry_on_failure(self):
+        db_file = self.journal_file.with_suffix(".json")
+        batch_generate_v3.apply_result(self.db, "一", {"summary": "一"}, "")
+        db_file.write_bytes(batch_generate_v3._dumps_db(self.db))
+
+        with mock.patch.object(batch_generate_v3, "DB_FILE", db_file):
+            self.assertFalse(batch_generate_v3.persist_one_result(None, "一", None, "timeout_after=180s"))
+            self.assertTrue(batch_generate_v3.persist_one_result(None, "二", None, "timeout_after=180s"))
+
+        saved = json.loads(db_file.read_text(encoding="utf-8"))
+        self.assertEqual(saved["kanji"]["一"]["status"], "completed")
+        self.assertEqual(saved["kanji"]["一"]["data"], {"summary": "一"})
+        self.assertEqual(saved["kanji"]["二"]["status"], "failed")
+
+    def test_replay_journal_without_journal_is_noop(self):
+        self.assertEqual(batch_generate_v3.replay_journal(self.db), 0)
+        self.assertEqual(self.db["meta"]["completed"], 0)
+
+
 if __name__ == "__main__":
     unittest.main()
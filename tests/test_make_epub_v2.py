@@ -6,7 +6,12 @@ import unittest
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT / "scripts"))
 
-from make_epub_v2 import _grade_kanji_in_db_order, _grade_title, _grades_in_db_order  # noqa: E402
+from make_epub_v2 import (  # noqa: E402
+    _completed_by_grade,
+    _grade_kanji_in_db_order,
+    _grade_title,
+    _grades_in_db_order,
+)
 
 
 class MakeEpubV2OrderTest(unittest.TestCase):
@@ -37,6 +42,23 @@ class MakeEpubV2OrderTest(unittest.TestCase):
         self.assertEqual(_grades_in_db_order(db), [1, 7])
         self.assertEqual(_grade_title(7), "常用补充")
 
+    def test_completed_by_grade_buckets_in_one_pass(self):
+        db = {
+            "kanji": {
+                "亜": {"grade": 7, "status": "completed"},
+                "語": {"grade": 2, "status": "completed"},
+                "見": {"grade": 1, "status": "completed"},
+                "生": {"grade": 1, "status": "pending"},
+                "上": {"grade": 1, "status": "completed"},
+            }
+        }
+
+        buckets = _completed_by_grade(db)
+
+        self.assertEqual(list(buckets), [1, 2, 7])
+        self.assertEqual([kanji for kanji, _ in buckets[1]], ["見", "上"])
+        self.assertEqual(_grade_kanji_in_db_order(db, 3), [])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -6,7 +6,7 @@ import unittest
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT / "scripts"))
 
-from render_kanji import _numbered_pinyin_to_tone_marks, render  # noqa: E402
+from render_kanji import _numbered_pinyin_to_tone_marks, render, render_html  # noqa: E402
 
 
 class RenderKanjiTest(unittest.TestCase):
@@ -374,6 +374,69 @@ class RenderKanjiTest(unittest.TestCase):
         self.assertIn("请给我普通份。", output)
         self.assertNotIn("na1 mi1", output)
 
+    def test_render_html_memory_schema_without_markdown(self):
+        output = render_html(
+            "狭",
+            {
+                "summary": "先看 `狭い` 的空间感。",
+                "semantic_core": {"core": "空间小", "extension": "引申到心胸", "root_hint": "犭+夹"},
+                "readings": [
+                    {
+                        "kana": "せま",
+                        "romaji": "sema",
+                        "type": "训读",
+                        "usage": "房间、道路",
+                        "origin_hint": "和语",
+                        "example_sentence": {"jp_ruby": "狭[せま]い部屋[へや]", "zh": "狭窄的房间"},
+                        "anchor": {"word": "狭い", "reading": "せまい", "meaning": "窄", "hint": "入口词"},
+                        "examples": [{"word": "狭め", "reading": "せまめ", "meaning": "偏窄", "link": "狭い < 広い"}],
+                        "takeaway": "空间小先想せまい。",
+                    }
+                ],
+                "scenario_contrast_groups": [],
+                "homophone_groups": [],
+                "near_synonym_groups": [],
+                "same_kanji_expansion_groups": [],
+                "pitfalls": ["不要读成*きょう*い。"],
+                "memory_chain": "狭い & 広い 成对记。",
+            },
+        )
+
+        self.assertNotIn("##", output)
+        self.assertNotIn("|", output)
+        self.assertIn("<h2>读音总览</h2>", output)
+        self.assertIn("<p>先看 <code>狭い</code> 的空间感。</p>", output)
+        self.assertIn("<thead><tr><th>读法</th><th>罗马字</th><th>类型</th><th>使用场景</th></tr></thead>", output)
+        self.assertIn("<tr><td>狭め</td><td>せまめ</td><td>偏窄</td><td>狭い &lt; 広い</td></tr>", output)
+        self.assertIn("<h4>例句与发音</h4>", output)
+        self.assertIn("<ruby>狭<rt>せま</rt></ruby>", output)
+        self.assertIn("<li>不要读成*きょう*い。</li>", output)
+        self.assertIn("<p>（没有特别高价值的场景对照组）</p>", output)
+        self.assertIn("<blockquote><p>狭い &amp; 広い 成对记。</p></blockquote>", output)
+
+    def test_render_html_legacy_schema(self):
+        output = render_html(
+            "日",
+            {
+                "summary": "太阳与日期。",
+                "readings": [
+                    {
+                        "kana": "にち",
+                        "romaji": "nichi",
+                        "type": "音读",
+                        "anchor": {"word": "毎日", "reading": "まいにち", "meaning": "每天"},
+                        "examples": [],
+                    }
+                ],
+                "culture": "历法",
+                "memory_chain": "毎日带出にち。",
+            },
+        )
+
+        self.assertIn("<h3>读法1：にち（nichi）</h3>", output)
+        self.assertIn("<tr><td>毎日</td><td>まいにち</td><td>每天</td><td>锚点词</td></tr>", output)
+        self.assertIn("<h2>文化背景</h2>", output)
+
 
 if __name__ == "__main__":
     unittest.main()